@@ -4,16 +4,38 @@ import random
 import asyncio
 import platform
 import re
+import sys
+import glob
+import gzip
+import queue
+import shutil
+import sqlite3
+import atexit
+import heapq
+import hashlib
+import html
+import math
+import threading
+import cProfile
+import pstats
+import logging
+import tracemalloc
+from collections import Counter, OrderedDict, deque
+import email.utils
+from datetime import datetime
+from types import SimpleNamespace
 
 import openai
 from playwright.async_api import async_playwright
 import json
+import csv
 
 # ---------------------- 🔐 CONFIG ----------------------
 
 import os
 # ✅ Load secrets from environment variables
-openai_client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Retries are handled by call_llm() below, so the SDK's own retry loop is disabled
+openai_client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
 X_USERNAME = os.getenv("X_USERNAME")
 X_PASSWORD = os.getenv("X_PASSWORD")
 
@@ -41,6 +63,109 @@ def load_config():
         "max_action_delay": 2.5,
         "debug_mode": True,
         "max_reply_attempts": 3,
+        "heartbeat_interval": 5,
+        "log_file": "logs/automation_events.jsonl",
+        "log_max_bytes": 5242880,
+        "log_backup_count": 5,
+        "log_sampling": {"tweet_seen": 0.25},
+        "log_to_stdout": False,
+        "analytics_db": "data/automation_metrics.db",
+        "reply_model": "gpt-4",
+        "gate_model": "gpt-3.5-turbo",
+        "gate_mode": "model",
+        "gate_threshold": 6,
+        "stream_replies": True,
+        "max_reply_chars": 280,
+        "reply_candidates": {
+            "n": 3,
+            "max_attempts": 2,
+            "max_similarity": 0.6,
+            "recent_replies": 50,
+            "banned_phrases": ["as an ai", "great point", "couldn't agree more", "in today's fast-paced world",
+                               "game-changer", "let's dive in"]
+        },
+        "keyword_weights": {},
+        "topic_profile": "",
+        "score_weights": {"keywords": 0.35, "topic": 0.35, "length": 0.1, "engagement": 0.2},
+        "score_threshold": 0.3,
+        "max_candidates_per_scroll": 3,
+        "candidate_queue": {
+            "max_size": 50,
+            "max_age_minutes": 120,
+            "freshness_half_life_minutes": 45,
+            "reply_interval": 45
+        },
+        "near_duplicates": {
+            "max_distance": 3,
+            "max_entries": 5000,
+            "min_words": 5
+        },
+        "scroll_readiness": {
+            "quiet_ms": 400,
+            "idle_quiet_ms": 1500,
+            "poll_interval": 0.25
+        },
+        "idle_backoff": {
+            "base_wait": 10,
+            "max_wait": 300,
+            "refresh_after": 3
+        },
+        "ingestion_mode": "network",
+        "session_mode": "profile",
+        "session_snapshot": "data/storage_state.json",
+        "snapshot_refresh_interval": 1800,
+        "checkpoint_file": "data/checkpoint.json",
+        "checkpoint_interval": 60,
+        "resume_from_checkpoint": True,
+        "dry_run_output": "data/dry_run_replies.jsonl",
+        "dry_run_concurrency": 4,
+        "profiling": {
+            "hooks": [],
+            "output_dir": "logs/profiles",
+            "slow_callback_ms": 100,
+            "loop_lag_interval": 0.5,
+            "loop_lag_warn_ms": 250,
+            "tracemalloc_interval": 300,
+            "tracemalloc_frames": 10,
+            "playwright_trace_seconds": 120
+        },
+        "auth_check_interval": 120,
+        "watchdog": {
+            "stall_window": 180,
+            "check_interval": 10,
+            "action_timeout": 60
+        },
+        "adaptive_timeouts": {
+            "percentile": 0.95,
+            "margin": 1.5,
+            "window": 50,
+            "min_samples": 5,
+            "bounds": {
+                "home_load": [10, 120],
+                "tweet_poll": [4, 60],
+                "login_check": [2, 20],
+                "dialog": [2, 30],
+                "submission": [5, 60]
+            }
+        },
+        "llm_resilience": {
+            "timeout": 30,
+            "max_retries": 3,
+            "backoff_base": 1.0,
+            "backoff_max": 30,
+            "breaker_failure_threshold": 5,
+            "breaker_cooldown": 60
+        },
+        "generation_budget": {
+            "max_tokens_per_run": None,
+            "max_cost_per_run": 2.0,
+            "max_cost_per_day": 10.0,
+            "max_error_rate": 0.5,
+            "error_window": 10,
+            "error_pause_seconds": 300,
+            "throttle_fraction": 0.8,
+            "throttle_interval": 30
+        },
         "reply_prompt": """As an experienced industry leader, reply to "{tweet_text}" in under *260 characters*. Match their tone, be respectful, add insight from experience, never mention yourself, avoid clichés/slang, and invite meaningful dialogue."""
     }
 
@@ -58,31 +183,915 @@ MAX_ACTION_DELAY = config["max_action_delay"]
 DEBUG_MODE = config["debug_mode"]
 MAX_REPLY_ATTEMPTS = config["max_reply_attempts"]
 REPLY_PROMPT_TEMPLATE = config["reply_prompt"]
+HEARTBEAT_INTERVAL = config.get("heartbeat_interval", 5)
+REPLY_MODEL = config.get("reply_model", "gpt-4")
+GATE_MODEL = config.get("gate_model", "gpt-3.5-turbo")
+GATE_MODE = config.get("gate_mode", "model")  # "model", "heuristic" or "off"
+GATE_THRESHOLD = config.get("gate_threshold", 6)
+STREAM_REPLIES = config.get("stream_replies", True)
+MAX_REPLY_CHARS = config.get("max_reply_chars", 280)  # Weighted the way X counts (URLs 23, CJK/emoji 2)
+REPLY_CANDIDATES = config.get("reply_candidates", {})
+LLM_RESILIENCE = config.get("llm_resilience", {})
+KEYWORD_WEIGHTS = config.get("keyword_weights", {})
+TOPIC_PROFILE = config.get("topic_profile", "")
+SCORE_WEIGHTS = config.get("score_weights", {"keywords": 0.35, "topic": 0.35, "length": 0.1, "engagement": 0.2})
+SCORE_THRESHOLD = config.get("score_threshold", 0.3)
+MAX_CANDIDATES_PER_SCROLL = config.get("max_candidates_per_scroll", 3)
+CANDIDATE_QUEUE = config.get("candidate_queue", {})
+NEAR_DUPLICATES = config.get("near_duplicates", {})
+SCROLL_READINESS = config.get("scroll_readiness", {})
+IDLE_BACKOFF = config.get("idle_backoff", {})
+INGESTION_MODE = config.get("ingestion_mode", "network")  # "network" or "dom"
+SESSION_MODE = config.get("session_mode", "profile")  # "profile" or "snapshot"
+SESSION_SNAPSHOT = config.get("session_snapshot", "data/storage_state.json")
+SNAPSHOT_REFRESH_INTERVAL = config.get("snapshot_refresh_interval", 1800)
+CHECKPOINT_FILE = config.get("checkpoint_file", "data/checkpoint.json")
+CHECKPOINT_INTERVAL = config.get("checkpoint_interval", 60)
+RESUME_FROM_CHECKPOINT = config.get("resume_from_checkpoint", True)
+DRY_RUN_OUTPUT = config.get("dry_run_output", "data/dry_run_replies.jsonl")  # .csv for CSV
+DRY_RUN_CONCURRENCY = config.get("dry_run_concurrency", 4)
+PROFILING = config.get("profiling", {})
+ADAPTIVE_TIMEOUTS = config.get("adaptive_timeouts", {})
+AUTH_CHECK_INTERVAL = config.get("auth_check_interval", 120)
+WATCHDOG = config.get("watchdog", {})
 
-# ✅ Fixed timeouts
+# ✅ Starting timeouts (seconds); adapted at runtime from observed latencies
 HOME_PAGE_LOAD_TIMEOUT = 60  # Timeout for home page loading
+TWEET_POLL_TIMEOUT = 20  # Timeline visible -> at least 3 tweets rendered
+LOGIN_CHECK_TIMEOUT = 5
 REPLY_SUBMISSION_TIMEOUT = 30
 DIALOG_DETECTION_TIMEOUT = 10
 # -------------------------------------------------------
 
+# ---------------------- 📜 EVENT LOG ----------------------
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+class EventLog:
+    """Structured JSONL event log written by a buffered background thread.
+
+    Callers only build a dict and push it onto a queue; serialization, file I/O,
+    size-based rotation and gzip compression all happen on the writer thread.
+    """
+
+    def __init__(self, path, level="info", max_bytes=5 * 1024 * 1024, backup_count=5,
+                 sampling=None, echo=False, flush_interval=1.0, batch_size=200):
+        self.path = path
+        self.level = LOG_LEVELS.get(level, LOG_LEVELS["info"])
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.sampling = sampling or {}
+        self.echo = echo
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        self._size = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, event, level="info", **fields):
+        """Queue one event; dropped if below the log level or sampled out"""
+        if self._closed or LOG_LEVELS.get(level, 0) < self.level:
+            return
+        rate = self.sampling.get(event)
+        if rate is not None and random.random() >= rate:
+            return
+        record = {"ts": time.time(), "event": event, "level": level}
+        record.update(fields)
+        self._queue.put(record)
+        if self.echo:
+            print(fields.get("msg") or f"[{event}] {fields}")
+
+    def close(self):
+        """Flush everything still queued and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+
+    # -- writer thread --
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+
+    def _run(self):
+        buffer = []
+        last_flush = time.time()
+        while True:
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                record = False
+
+            if record:
+                buffer.append(record)
+            if buffer and (record is None or len(buffer) >= self.batch_size
+                           or time.time() - last_flush >= self.flush_interval):
+                self._write(buffer)
+                buffer = []
+                last_flush = time.time()
+            if record is None:
+                break
+
+        if self._file:
+            self._file.close()
+
+    def _write(self, records):
+        try:
+            if self._file is None:
+                self._open()
+            data = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records)
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data.encode("utf-8"))
+            if self._size >= self.max_bytes:
+                self._rotate()
+        except Exception as e:
+            # Nowhere left to log to; stderr is the last resort
+            print(f"⚠️ Event log write failed: {e}", file=sys.stderr)
+
+    def _rotate(self):
+        """Move the current file aside, gzip it, and prune old archives"""
+        self._file.close()
+        self._file = None
+        now = time.time()
+        rotated = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}{int(now % 1 * 1000):03d}"
+        os.replace(self.path, rotated)
+        with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(rotated)
+
+        archives = sorted(glob.glob(f"{glob.escape(self.path)}.*.gz"))
+        for old in archives[:-self.backup_count] if self.backup_count > 0 else archives:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        self._open()
+
+event_log = EventLog(
+    config.get("log_file", "logs/automation_events.jsonl"),
+    level=config.get("log_level", "debug" if DEBUG_MODE else "info"),
+    max_bytes=config.get("log_max_bytes", 5 * 1024 * 1024),
+    backup_count=config.get("log_backup_count", 5),
+    sampling=config.get("log_sampling", {"tweet_seen": 0.25}),
+    echo=config.get("log_to_stdout", False)
+)
+atexit.register(event_log.close)
+
+def log(message, level="info", **fields):
+    """Record a free-form progress message in the event log"""
+    event_log.emit("message", level, msg=message, **fields)
+
+def log_error(stage, error, **fields):
+    """Record a failure as an `error` event tagged with the stage it happened in"""
+    event_log.emit("error", "error", stage=stage, error=str(error), **fields)
+
+# ---------------------- 🛡️ RESILIENT LLM CLIENT ----------------------
+class LLMUnavailable(Exception):
+    """Raised without calling upstream while the circuit breaker is open"""
+
+class CircuitBreaker:
+    """Stops calling a failing upstream after consecutive failures, then probes it.
+
+    closed: calls flow normally. open: calls are refused until `cooldown` seconds
+    have passed. half_open: exactly one probe call is let through; its outcome
+    closes the breaker again or re-opens it for another cooldown.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=60):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.times_opened = 0
+
+    def accepting(self):
+        """Whether new work should be queued for the upstream (does not consume the probe)"""
+        if self.state == "open":
+            return time.time() - self.opened_at >= self.cooldown
+        if self.state == "half_open":
+            return not self.probe_in_flight
+        return True
+
+    def allow(self):
+        """Whether a call may go out right now; in half-open state this claims the single probe"""
+        if self.state == "open" and time.time() - self.opened_at >= self.cooldown:
+            self.state = "half_open"
+            log("🩺 LLM circuit half-open, probing upstream")
+        if self.state == "half_open":
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+            return True
+        return self.state == "closed"
+
+    def record_success(self):
+        if self.state != "closed":
+            log("✅ LLM circuit closed, upstream recovered")
+            event_log.emit("breaker_state", state="closed")
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def release_probe(self):
+        """Give the probe back without an outcome (the call was cancelled)"""
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                log(f"🔌 LLM circuit opened after {self.consecutive_failures} consecutive failures", "warning")
+                event_log.emit("breaker_state", "warning", state="open", failures=self.consecutive_failures)
+            self.state = "open"
+            self.opened_at = time.time()
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_at": self.opened_at if self.state != "closed" else None,
+            "times_opened": self.times_opened
+        }
+
+llm_breaker = CircuitBreaker(
+    failure_threshold=LLM_RESILIENCE.get("breaker_failure_threshold", 5),
+    cooldown=LLM_RESILIENCE.get("breaker_cooldown", 60)
+)
+llm_call_stats = {"calls": 0, "retries": 0, "timeouts": 0, "rate_limited": 0, "failures": 0, "refused": 0}
+
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    asyncio.TimeoutError
+)
+
+def retry_after_seconds(error):
+    """Server-requested wait from Retry-After / retry-after-ms headers, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            # HTTP-date form
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+async def call_llm(**request):
+    """chat.completions.create with a per-request timeout, jittered retries and the circuit breaker.
+
+    Raises LLMUnavailable without touching the network while the breaker is open,
+    and re-raises the last error once retries are exhausted.
+    """
+    if not llm_breaker.allow():
+        llm_call_stats["refused"] += 1
+        raise LLMUnavailable(f"circuit {llm_breaker.state}")
+
+    timeout = LLM_RESILIENCE.get("timeout", 30)
+    max_retries = LLM_RESILIENCE.get("max_retries", 3)
+    backoff_base = LLM_RESILIENCE.get("backoff_base", 1.0)
+    backoff_max = LLM_RESILIENCE.get("backoff_max", 30)
+
+    try:
+        for attempt in range(max_retries + 1):
+            llm_call_stats["calls"] += 1
+            try:
+                # The SDK timeout covers the HTTP exchange; wait_for guards against anything hanging past it
+                response = await asyncio.wait_for(
+                    openai_client.chat.completions.create(timeout=timeout, **request),
+                    timeout + 5
+                )
+                llm_breaker.record_success()
+                return response
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, (openai.APITimeoutError, asyncio.TimeoutError)):
+                    llm_call_stats["timeouts"] += 1
+                if isinstance(e, openai.RateLimitError):
+                    llm_call_stats["rate_limited"] += 1
+                if attempt == max_retries:
+                    llm_call_stats["failures"] += 1
+                    llm_breaker.record_failure()
+                    raise
+
+                # Full jitter, but never sooner than the server asked for
+                delay = random.uniform(0, min(backoff_max, backoff_base * 2 ** attempt))
+                requested = retry_after_seconds(e)
+                if requested is not None:
+                    delay = max(delay, min(requested, backoff_max))
+                llm_call_stats["retries"] += 1
+                log(f"🔁 LLM call failed ({type(e).__name__}), retry {attempt + 1}/{max_retries} in {delay:.1f}s", "warning")
+                await asyncio.sleep(delay)
+            except Exception:
+                # Bad request, auth errors and the like will not get better by retrying
+                llm_call_stats["failures"] += 1
+                llm_breaker.record_failure()
+                raise
+    except asyncio.CancelledError:
+        # Cancellation is a BaseException: without this a cancelled half-open probe would hold the slot forever
+        llm_breaker.release_probe()
+        raise
+
+def llm_health_snapshot():
+    """Breaker state and retry counters for the stats file"""
+    return dict(llm_call_stats, breaker=llm_breaker.snapshot())
+
+# ---------------------- 💰 USAGE ACCOUNTING & SPEND GOVERNOR ----------------------
+# USD per 1K tokens; models not listed here are matched by their longest listed prefix
+DEFAULT_MODEL_PRICING = {
+    "gpt-4": {"prompt": 0.03, "completion": 0.06},
+    "gpt-4-turbo": {"prompt": 0.01, "completion": 0.03},
+    "gpt-4o": {"prompt": 0.005, "completion": 0.015},
+    "gpt-4o-mini": {"prompt": 0.00015, "completion": 0.0006},
+    "gpt-3.5-turbo": {"prompt": 0.0005, "completion": 0.0015}
+}
+MODEL_PRICING = config.get("model_pricing", DEFAULT_MODEL_PRICING)
+GENERATION_BUDGET = config.get("generation_budget", {})
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """Estimated USD cost of one completion"""
+    matches = [name for name in MODEL_PRICING if model == name or model.startswith(name + "-")]
+    if not matches:
+        return 0.0
+    price = MODEL_PRICING[max(matches, key=len)]
+    return (prompt_tokens * price["prompt"] + completion_tokens * price["completion"]) / 1000
+
+class UsageTracker:
+    """Per-run and per-day totals of LLM calls, tokens, latency and estimated cost"""
+
+    def __init__(self):
+        self.run = self._empty()
+        self.today = self._empty()
+        # UTC day index, matching the analytics store's day buckets
+        self.day = int(time.time() // 86400)
+        self.by_model = {}
+
+    @staticmethod
+    def _empty():
+        return {"calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "cost_usd": 0.0, "latency_s": 0.0}
+
+    def seed_today(self, totals):
+        """Start today's totals from what earlier runs already spent"""
+        for key in self.today:
+            self.today[key] += totals.get(key, 0)
+
+    def record(self, model, prompt_tokens, completion_tokens, latency, ok=True):
+        """Account for one call; returns its estimated cost"""
+        today = int(time.time() // 86400)
+        if today != self.day:
+            self.day, self.today = today, self._empty()
+
+        cost = estimate_cost(model, prompt_tokens, completion_tokens) if ok else 0.0
+        for totals in (self.run, self.today, self.by_model.setdefault(model, self._empty())):
+            totals["calls"] += 1
+            totals["errors"] += 0 if ok else 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["cost_usd"] += cost
+            totals["latency_s"] += latency
+        return cost
+
+    def snapshot(self):
+        """Totals for the stats file"""
+        def summarize(totals):
+            summary = dict(totals)
+            summary["cost_usd"] = round(summary["cost_usd"], 4)
+            summary["avg_latency_s"] = round(totals["latency_s"] / totals["calls"], 3) if totals["calls"] else None
+            del summary["latency_s"]
+            return summary
+        return {
+            "run": summarize(self.run),
+            "today": summarize(self.today),
+            "by_model": {model: summarize(t) for model, t in self.by_model.items()}
+        }
+
+class GenerationGovernor:
+    """Throttles or pauses generation when spend or error-rate limits are reached.
+
+    Budgets come from `generation_budget` in config.json; any limit left unset is
+    not enforced. Past `throttle_fraction` of a budget, reply generations are
+    spaced at least `throttle_interval` seconds apart by admit(), which waits for
+    its slot rather than refusing; cheap calls such as the gate only go through
+    check(). At the budget itself generation pauses (for the rest of the run, or
+    until midnight for the daily budget). A burst of failures pauses generation
+    for `error_pause_seconds`.
+    """
+
+    def __init__(self, tracker, budget):
+        self.tracker = tracker
+        self.max_tokens_per_run = budget.get("max_tokens_per_run")
+        self.max_cost_per_run = budget.get("max_cost_per_run")
+        self.max_cost_per_day = budget.get("max_cost_per_day")
+        self.max_error_rate = budget.get("max_error_rate", 0.5)
+        self.error_window = budget.get("error_window", 10)
+        self.min_error_samples = budget.get("min_error_samples", 4)
+        self.error_pause_seconds = budget.get("error_pause_seconds", 300)
+        self.throttle_fraction = budget.get("throttle_fraction", 0.8)
+        self.throttle_interval = budget.get("throttle_interval", 30)
+        self.recent_results = []
+        self.paused_until = 0
+        self.pause_reason = None
+        self.last_call = 0
+        self.denied = 0
+        self.throttled = 0
+
+    def _budget_usage(self):
+        """Fraction of each configured budget already used"""
+        usage = []
+        run, today = self.tracker.run, self.tracker.today
+        if self.max_tokens_per_run:
+            usage.append(("run token budget", (run["prompt_tokens"] + run["completion_tokens"]) / self.max_tokens_per_run))
+        if self.max_cost_per_run:
+            usage.append(("run cost budget", run["cost_usd"] / self.max_cost_per_run))
+        if self.max_cost_per_day:
+            usage.append(("daily cost budget", today["cost_usd"] / self.max_cost_per_day))
+        return usage
+
+    def check(self):
+        """Return (allowed, reason) for starting another LLM call"""
+        if time.time() < self.paused_until:
+            self.denied += 1
+            return False, self.pause_reason
+
+        for name, used in self._budget_usage():
+            if used >= 1:
+                if name == "daily cost budget":
+                    self._pause((self.tracker.day + 1) * 86400, f"{name} exhausted")
+                else:
+                    self._pause(float("inf"), f"{name} exhausted")
+                self.denied += 1
+                return False, self.pause_reason
+        return True, None
+
+    async def admit(self):
+        """check() for a reply generation, waiting out the throttle spacing near a budget"""
+        allowed, reason = self.check()
+        if not allowed:
+            return allowed, reason
+
+        now = time.time()
+        near = [name for name, used in self._budget_usage() if used >= self.throttle_fraction]
+        # Reserve the next slot before sleeping so concurrent generations queue up behind each other
+        slot = max(now, self.last_call + self.throttle_interval) if near else now
+        self.last_call = slot
+        if slot > now:
+            self.throttled += 1
+            log(f"🐢 Throttled near {near[0]}, generating in {slot - now:.0f}s")
+            await asyncio.sleep(slot - now)
+            # The budget may have run out while we waited
+            return self.check()
+        return True, None
+
+    def record_result(self, ok):
+        """Feed call outcomes into the error-rate window"""
+        self.recent_results = (self.recent_results + [ok])[-self.error_window:]
+        if len(self.recent_results) >= self.min_error_samples:
+            error_rate = self.recent_results.count(False) / len(self.recent_results)
+            if error_rate > self.max_error_rate:
+                self._pause(time.time() + self.error_pause_seconds, f"error rate {error_rate:.0%}")
+                self.recent_results = []
+
+    def _pause(self, until, reason):
+        if self.paused_until != until:
+            log(f"⏸️ Pausing generation: {reason}", "warning")
+            event_log.emit("generation_paused", "warning", reason=reason,
+                           until=None if until == float("inf") else until)
+        self.paused_until = until
+        self.pause_reason = reason
+
+    def snapshot(self):
+        """Governor state for the stats file"""
+        paused = time.time() < self.paused_until
+        return {
+            "paused": paused,
+            "reason": self.pause_reason if paused else None,
+            "paused_until": self.paused_until if paused and self.paused_until != float("inf") else None,
+            "denied": self.denied,
+            "throttled": self.throttled,
+            "budget_used": {name: round(used, 3) for name, used in self._budget_usage()}
+        }
+
+usage_tracker = UsageTracker()
+generation_governor = GenerationGovernor(usage_tracker, GENERATION_BUDGET)
+
+def record_llm_call(model, purpose, latency, usage=None, ok=True, tweet_id=None):
+    """Account one LLM call in the tracker, governor, analytics store and event log"""
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    cost = usage_tracker.record(model, prompt_tokens, completion_tokens, latency, ok)
+    generation_governor.record_result(ok)
+
+    analytics.record("llm_calls")
+    analytics.record("prompt_tokens", prompt_tokens)
+    analytics.record("completion_tokens", completion_tokens)
+    analytics.record("cost_usd", cost)
+    if not ok:
+        analytics.record("llm_errors")
+
+    event_log.emit("llm_call", tweet_id=tweet_id, model=model, purpose=purpose, ok=ok,
+                   prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                   cost_usd=round(cost, 6), latency_ms=round(latency * 1000))
+    return cost
+
 # ---------------------- 🧠 OPENAI GENERATION ----------------------
-async def generate_valuable_reply(tweet_text):
-    """Generate a valuable, tone-matched reply using OpenAI's API"""
-    prompt = REPLY_PROMPT_TEMPLATE.format(tweet_text=tweet_text)
+def clean_reply_text(text):
+    """Strip double quotes and normalize curly apostrophes so the reply types cleanly"""
+    return (text.replace('"', '').replace('\u201c', '').replace('\u201d', '')
+            .replace('\u2018', "'").replace('\u2019', "'"))
+
+URL_PATTERN = re.compile(r"https?://\S+", re.IGNORECASE)
+# Code point ranges X counts as one; everything else (CJK, emoji, ...) counts as two
+LIGHT_RANGES = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))
+URL_WEIGHT = 23
+
+def weighted_length(text):
+    """Reply length as X counts it: each URL is 23, most Latin-script characters 1, CJK and emoji 2"""
+    length = URL_WEIGHT * len(URL_PATTERN.findall(text))
+    joined = False
+    for char in URL_PATTERN.sub("", text):
+        code = ord(char)
+        # Joiners, variation selectors and skin tones are part of the emoji before them
+        if code == 0x200D:
+            joined = True
+            continue
+        if joined or code == 0xFE0F or 0x1F3FB <= code <= 0x1F3FF:
+            joined = False
+            continue
+        length += 1 if any(low <= code <= high for low, high in LIGHT_RANGES) else 2
+    return length
+
+def finalize_reply_text(text):
+    """Post-generation validation: quote cleanup, trimming, and the length limit"""
+    reply = clean_reply_text(text).strip()
+    if weighted_length(reply) > MAX_REPLY_CHARS:
+        cut = reply[:MAX_REPLY_CHARS]
+        while weighted_length(cut) > MAX_REPLY_CHARS:
+            cut = cut[:-1]
+        # Prefer ending on a full sentence, then on a word boundary
+        sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+        if sentence_end >= MAX_REPLY_CHARS // 2:
+            cut = cut[:sentence_end + 1]
+        elif " " in cut:
+            cut = cut[:cut.rfind(" ")]
+        reply = cut.rstrip(" ,;:-")
+    return reply
+
+def word_pairs(text):
+    words = re.findall(r"\w+", text.lower())
+    return set(zip(words, words[1:])) or set(words)
+
+class ReplyValidator:
+    """Local checks that pick the best of several generated reply candidates.
+
+    A candidate is invalid when it is empty, longer than MAX_REPLY_CHARS by X's
+    weighted count, contains a banned phrase, or shares more than max_similarity
+    of its word pairs with one of the recent_replies most recent replies. The
+    valid candidate least similar to recent replies wins.
+    """
+
+    def __init__(self, settings):
+        self.max_similarity = settings.get("max_similarity", 0.6)
+        self.banned_phrases = [phrase.lower() for phrase in settings.get("banned_phrases", [])]
+        self.recent = deque(maxlen=settings.get("recent_replies", 50))
+        self.stats = {"candidates": 0, "valid": 0, "reprompts": 0, "exhausted": 0,
+                      "rejected": Counter()}
+
+    def similarity(self, reply):
+        """Highest Jaccard similarity of word pairs with a recent reply"""
+        pairs = word_pairs(reply)
+        return max((len(pairs & other) / len(pairs | other) for other in self.recent if pairs | other), default=0.0)
+
+    def check(self, reply):
+        """Rejection reason for a cleaned candidate, or None if it is valid; also returns its similarity"""
+        if not reply:
+            return "empty", 0.0
+        if weighted_length(reply) > MAX_REPLY_CHARS:
+            return "too_long", 0.0
+        lowered = reply.lower()
+        if any(phrase in lowered for phrase in self.banned_phrases):
+            return "banned_phrase", 0.0
+        similarity = self.similarity(reply)
+        if similarity > self.max_similarity:
+            return "too_similar", similarity
+        return None, similarity
+
+    def judge(self, reply):
+        """check() a candidate and count the outcome"""
+        reason, similarity = self.check(reply)
+        self.stats["candidates"] += 1
+        if reason:
+            self.stats["rejected"][reason] += 1
+        else:
+            self.stats["valid"] += 1
+        return reason, similarity
+
+    def pick(self, texts):
+        """Best valid candidate and the rejection reasons of the others"""
+        best, best_similarity, reasons = None, None, []
+        for text in texts:
+            reply = clean_reply_text(text or "").strip()
+            reason, similarity = self.judge(reply)
+            if reason:
+                reasons.append(reason)
+                continue
+            if best is None or similarity < best_similarity:
+                best, best_similarity = reply, similarity
+        return best, reasons
+
+    def remember(self, reply):
+        self.recent.append(word_pairs(reply))
+
+    def snapshot(self):
+        candidates = self.stats["candidates"]
+        return {
+            "candidates": candidates,
+            "valid_rate": round(self.stats["valid"] / candidates, 3) if candidates else None,
+            "reprompts": self.stats["reprompts"],
+            "exhausted": self.stats["exhausted"],
+            "rejected": dict(self.stats["rejected"])
+        }
+
+reply_validator = ReplyValidator(REPLY_CANDIDATES)
+
+def record_generation(tweet_id, reply, started, **fields):
+    """Emit generation_done and count the generation in the analytics store"""
+    event_log.emit("generation_done", tweet_id=tweet_id, reply=reply,
+                   generation_ms=round((time.time() - started) * 1000), **fields)
+    analytics.record("generated")
+    analytics.record_latency("generation", time.time() - started)
+
+async def generate_valuable_reply(tweet_text, tweet_id=None, details=None, throttled=True):
+    """Generate a valuable, tone-matched reply using OpenAI's API.
+
+    Each call asks for several candidates and keeps the best one that passes
+    ReplyValidator; only when none does is the model asked again, told why.
+    Returns None when generation fails, the governor refuses the call or no
+    candidate is valid; callers skip the tweet instead of posting filler text.
+    If a details dict is given it receives the model, token usage, cost and
+    latency summed over the calls. throttled=False skips the governor's spacing
+    for a retry of a generation that already waited for its slot.
+    """
+    model = REPLY_MODEL
+    messages = [{"role": "user", "content": REPLY_PROMPT_TEMPLATE.format(tweet_text=tweet_text)}]
+    start = time.time()
+    totals = {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+    max_attempts = REPLY_CANDIDATES.get("max_attempts", 2)
+    for attempt in range(max_attempts):
+        # A re-prompt belongs to the same generation, so only the first call waits for a throttle slot
+        allowed, reason = await generation_governor.admit() if attempt == 0 and throttled else generation_governor.check()
+        if not allowed:
+            log(f"⏸️ Generation skipped: {reason}")
+            return None
+
+        call_start = time.time()
+        try:
+            response = await call_llm(model=model, messages=messages, n=REPLY_CANDIDATES.get("n", 3))
+        except LLMUnavailable as e:
+            log(f"🔌 Generation skipped: {e}")
+            return None
+        except Exception as e:
+            record_llm_call(model, "reply", time.time() - call_start, ok=False, tweet_id=tweet_id)
+            log_error("generation", e, tweet_id=tweet_id)
+            return None
+
+        totals["cost_usd"] += record_llm_call(model, "reply", time.time() - call_start, response.usage, tweet_id=tweet_id)
+        totals["prompt_tokens"] += getattr(response.usage, "prompt_tokens", 0)
+        totals["completion_tokens"] += getattr(response.usage, "completion_tokens", 0)
+        if details is not None:
+            details.update(model=model, attempts=attempt + 1, cost_usd=round(totals["cost_usd"], 6),
+                           prompt_tokens=totals["prompt_tokens"], completion_tokens=totals["completion_tokens"],
+                           latency_ms=round((time.time() - start) * 1000))
+
+        texts = [choice.message.content for choice in response.choices]
+        reply, rejected = reply_validator.pick(texts)
+        if reply:
+            reply_validator.remember(reply)
+            record_generation(tweet_id, reply, start, candidates=len(texts), rejected=rejected, attempts=attempt + 1)
+            return reply
+
+        log(f"✂️ All {len(texts)} reply candidates rejected ({', '.join(sorted(set(rejected)))})", "warning")
+        if attempt + 1 < max_attempts:
+            reply_validator.stats["reprompts"] += 1
+            messages += [{"role": "assistant", "content": texts[0] or ""},
+                         {"role": "user", "content": f"Rejected ({', '.join(sorted(set(rejected)))}). Write a new reply "
+                                                     f"under {MAX_REPLY_CHARS} characters, unlike your recent "
+                                                     f"replies, without stock phrases."}]
+
+    reply_validator.stats["exhausted"] += 1
+    event_log.emit("generation_rejected", "warning", tweet_id=tweet_id, attempts=max_attempts)
+    return None
+
+class ReplyStream:
+    """A streamed reply completion whose text can be consumed while it is still arriving.
+
+    Cleaned text chunks are pushed onto `chunks` as they arrive and a final None
+    marks the end of the stream. `result()` waits for completion and returns the
+    validated reply, which may differ from the raw stream (trimmed, shortened).
+    """
+
+    def __init__(self, tweet_text, tweet_id=None):
+        self.tweet_text = tweet_text
+        self.tweet_id = tweet_id
+        self.chunks = asyncio.Queue()
+        self.text = ""
+        self.failed = False
+        self.rejected = None
+        self.started = time.time()
+        self.first_token_at = None
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        prompt = REPLY_PROMPT_TEMPLATE.format(tweet_text=self.tweet_text)
+        completion_chunks = 0
+        stream_opened = False
+        try:
+            stream = await call_llm(
+                model=REPLY_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True
+            )
+            stream_opened = True
+            chunk_iterator = stream.__aiter__()
+            while True:
+                try:
+                    # A stream that stops sending is as bad as one that never started
+                    chunk = await asyncio.wait_for(chunk_iterator.__anext__(), LLM_RESILIENCE.get("timeout", 30))
+                except StopAsyncIteration:
+                    break
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                completion_chunks += 1
+                delta = clean_reply_text(delta)
+                if not self.text:
+                    delta = delta.lstrip()
+                if not delta:
+                    continue
+                if self.first_token_at is None:
+                    self.first_token_at = time.time()
+                self.text += delta
+                self.chunks.put_nowait(delta)
+
+            # Streamed responses carry no usage block; estimate ~4 chars per prompt token, one token per chunk
+            usage = SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=completion_chunks)
+            record_llm_call(REPLY_MODEL, "reply", time.time() - self.started, usage, tweet_id=self.tweet_id)
+        except asyncio.CancelledError:
+            self.failed = True
+            raise
+        except LLMUnavailable as e:
+            self.failed = True
+            log(f"🔌 Generation skipped: {e}")
+        except Exception as e:
+            self.failed = True
+            if stream_opened:
+                # Mid-stream failures happen after call_llm() returned, so the breaker hasn't seen them yet
+                llm_breaker.record_failure()
+            record_llm_call(REPLY_MODEL, "reply", time.time() - self.started, ok=False, tweet_id=self.tweet_id)
+            log_error("generation", e, tweet_id=self.tweet_id)
+        finally:
+            self.chunks.put_nowait(None)
+
+    async def result(self):
+        """Wait for the stream to finish and return the validated reply (None on failure)"""
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            return None
+        reply = None if self.failed else finalize_reply_text(self.text) or None
+        if reply:
+            # Same checks as a non-streamed candidate; a rejected reply is never submitted
+            self.rejected = reply_validator.judge(reply)[0]
+            if self.rejected:
+                log(f"✂️ Streamed reply rejected ({self.rejected}), discarding it", "warning")
+                return None
+            reply_validator.remember(reply)
+            record_generation(self.tweet_id, reply, self.started, streamed=True,
+                              first_token_ms=round((self.first_token_at - self.started) * 1000))
+        return reply
+
+    def cancel(self):
+        """Abandon the stream (no-op once it has finished)"""
+        self.task.cancel()
+
+async def start_reply_stream(tweet_text, tweet_id=None):
+    """Kick off a streamed reply, or return None if the governor refuses the call"""
+    allowed, reason = await generation_governor.admit()
+    if not allowed:
+        log(f"⏸️ Generation skipped: {reason}")
+        return None
+    return ReplyStream(tweet_text, tweet_id)
+
+# ---------------------- 🚦 RELEVANCE GATE ----------------------
+GATE_PROMPT = """Rate from 0 to 10 how worthwhile it is for a thoughtful industry leader to write a substantive public reply to this tweet. Score low for giveaways, spam, pure link shares, one-word posts, and content with nothing to discuss. Answer with the number only.
+
+Tweet: {tweet_text}"""
+
+GIVEAWAY_PATTERN = re.compile(
+    r'\b(giveaway|airdrop|retweet to win|rt to win|follow (and|&) (rt|retweet)|tag \d+ friends|win (a|an|free)|dm (me|us) for)\b',
+    re.IGNORECASE
+)
+ENGLISH_STOPWORDS = {
+    "the", "a", "an", "and", "or", "but", "is", "are", "was", "were", "to", "of", "in", "on",
+    "for", "with", "this", "that", "it", "we", "you", "i", "they", "be", "not", "have", "has",
+    "will", "can", "our", "your", "at", "by", "from", "as", "so", "what", "how", "why"
+}
+
+gate_stats = {"checked": 0, "passed": 0, "rejected_heuristic": 0, "rejected_model": 0, "gate_errors": 0}
+
+def heuristic_gate(tweet_text):
+    """Cheap local checks; returns a rejection reason or None if the tweet may deserve a reply"""
+    body = re.sub(r'https?://\S+|[@#]\w+', ' ', tweet_text)
+    words = re.findall(r"[^\W\d_]+(?:'[^\W\d_]+)?", body)
+
+    if not words and re.search(r'https?://', tweet_text):
+        return "link share"
+    if len(words) < 4:
+        return "too short"
+    if GIVEAWAY_PATTERN.search(tweet_text):
+        return "giveaway"
+
+    letters = [c for c in body if c.isalpha()]
+    latin = sum(1 for c in letters if c.isascii())
+    if letters and latin / len(letters) < 0.7:
+        return "non-English"
+    if len(words) >= 8 and not any(w.lower() in ENGLISH_STOPWORDS for w in words):
+        return "non-English"
+    return None
+
+async def score_reply_worthiness(tweet_text, tweet_id=None):
+    """Ask the cheap gate model for a 0-10 reply-worthiness score (None if unavailable)"""
+    allowed, reason = generation_governor.check()
+    if not allowed:
+        log(f"⏸️ Gate scoring skipped: {reason}")
+        return None
+
+    start = time.time()
     try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}]
+        response = await call_llm(
+            model=GATE_MODEL,
+            messages=[{"role": "user", "content": GATE_PROMPT.format(tweet_text=tweet_text)}],
+            max_tokens=3,
+            temperature=0
         )
-        reply = response.choices[0].message.content.strip()
-        
-        # Clean up quotes in the reply to avoid formatting issues
-        reply = reply.replace('"', '').replace('"', '').replace(''', "'").replace(''', "'")
-        
-        return reply
+        record_llm_call(GATE_MODEL, "gate", time.time() - start, response.usage, tweet_id=tweet_id)
+        match = re.search(r'\d+(\.\d+)?', response.choices[0].message.content or "")
+        return float(match.group()) if match else None
+    except LLMUnavailable:
+        return None
     except Exception as e:
-        print(f"⚠️ Error generating reply: {e}")
-        return "This is interesting! Tell me more about your perspective."
+        record_llm_call(GATE_MODEL, "gate", time.time() - start, ok=False, tweet_id=tweet_id)
+        log_error("gate", e, tweet_id=tweet_id)
+        return None
+
+async def passes_relevance_gate(tweet_text, tweet_id=None):
+    """First tier of the cascade: only tweets that pass reach the premium reply model"""
+    if GATE_MODE == "off":
+        return True
+
+    gate_stats["checked"] += 1
+    reason = heuristic_gate(tweet_text)
+    if reason:
+        gate_stats["rejected_heuristic"] += 1
+        event_log.emit("gate_rejected", tweet_id=tweet_id, tier="heuristic", reason=reason)
+        return False
+
+    if GATE_MODE == "model":
+        score = await score_reply_worthiness(tweet_text, tweet_id)
+        if score is None:
+            # The heuristic already passed it; don't let a flaky cheap model block the premium one
+            gate_stats["gate_errors"] += 1
+        elif score < GATE_THRESHOLD:
+            gate_stats["rejected_model"] += 1
+            event_log.emit("gate_rejected", tweet_id=tweet_id, tier="model", score=score)
+            return False
+
+    gate_stats["passed"] += 1
+    return True
+
+def gate_snapshot():
+    """Gate counters and pass rate for the stats file"""
+    snapshot = dict(gate_stats, mode=GATE_MODE, model=GATE_MODEL, threshold=GATE_THRESHOLD)
+    snapshot["pass_rate"] = round(gate_stats["passed"] / gate_stats["checked"], 3) if gate_stats["checked"] else None
+    return snapshot
 
 # ---------------------- 🧍 HUMAN-LIKE BEHAVIOR ----------------------
 async def random_delay(min_seconds=MIN_ACTION_DELAY, max_seconds=MAX_ACTION_DELAY):
@@ -108,9 +1117,51 @@ async def human_like_typing(page, selector, text):
         
         return True
     except Exception as e:
-        print(f"⚠️ Error during typing: {e}")
+        log(f"⚠️ Error during typing: {e}", "warning")
         return False
 
+async def type_streamed_reply(page, selector, reply_stream):
+    """Type a reply into the composer as its tokens arrive, then correct it to the validated text.
+
+    Returns the final reply text, or None if generation or typing failed.
+    """
+    try:
+        await page.click(selector)
+        await page.keyboard.press("Control+A")
+        await page.keyboard.press("Backspace")
+
+        typed = ""
+        while True:
+            chunk = await reply_stream.chunks.get()
+            if chunk is None:
+                break
+            for char in chunk:
+                if len(typed) >= MAX_REPLY_CHARS:
+                    break
+                await page.keyboard.type(char, delay=random.uniform(15, 100))
+                typed += char
+                if random.random() < 0.1:
+                    await asyncio.sleep(random.uniform(0.1, 0.3))
+
+        final_reply = await reply_stream.result()
+        if not final_reply:
+            return None
+
+        if final_reply != typed:
+            if typed.startswith(final_reply):
+                # Validation only trimmed the tail (whitespace, length limit): backspace it away
+                for _ in range(len(typed) - len(final_reply)):
+                    await page.keyboard.press("Backspace")
+            elif not await human_like_typing(page, selector, final_reply):
+                return None
+            log(f"✏️ Corrected streamed reply ({len(typed)} → {len(final_reply)} chars)", "debug")
+
+        return final_reply
+    except Exception as e:
+        log(f"⚠️ Error during streamed typing: {e}", "warning")
+        reply_stream.cancel()
+        return None
+
 # ---------------------- 🔍 DEBUG HELPERS ----------------------
 async def save_screenshot(page, filename):
     """Save a screenshot for debugging"""
@@ -122,49 +1173,558 @@ async def save_screenshot(page, filename):
         os.makedirs(screenshots_dir, exist_ok=True)
         screenshot_path = os.path.join(screenshots_dir, filename)
         await page.screenshot(path=screenshot_path, full_page=False)
-        print(f"📸 Screenshot saved: {screenshot_path}")
+        log(f"📸 Screenshot saved: {screenshot_path}")
     except Exception as e:
-        print(f"⚠️ Screenshot error: {e}")
+        log(f"⚠️ Screenshot error: {e}", "warning")
 
-async def is_verified(tweet):
-    """Simple check for verified badge using the exact selector"""
-    try:
-        # Use the data-testid from your HTML
-        verified = await tweet.query_selector('svg[data-testid="icon-verified"]')
-        return verified is not None
-    except Exception:
-        return False
+# ---------------------- 🧹 ELEMENT HANDLE LIFECYCLE ----------------------
+handle_stats = {"created": 0, "disposed": 0, "live": 0}
+
+class HandleScope:
+    """Owns the ElementHandles created for one unit of work and disposes them together.
+
+    A handle keeps its DOM node pinned in the renderer and an entry in the
+    driver's object table until it is disposed, even after X's virtualized
+    timeline has unmounted the article. Scopes make that disposal deterministic;
+    handle_stats["live"] counts handles still outstanding across all scopes.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._handles = []
+
+    def track(self, handle):
+        """Adopt a handle (None is passed through) and return it"""
+        if handle is not None:
+            self._handles.append(handle)
+            handle_stats["created"] += 1
+            handle_stats["live"] += 1
+        return handle
+
+    def track_all(self, handles):
+        for handle in handles:
+            self.track(handle)
+        return handles
+
+    async def dispose(self):
+        """Dispose every tracked handle; already-detached ones are ignored"""
+        handles, self._handles = self._handles, []
+        for handle in handles:
+            try:
+                await handle.dispose()
+            except Exception:
+                pass
+        handle_stats["disposed"] += len(handles)
+        handle_stats["live"] -= len(handles)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.dispose()
+
+# ---------------------- 📝 TWEET EXTRACTION ----------------------
+EXTRACT_TWEET_JS = """function(node) {
+    const textElement = node.querySelector('div[data-testid="tweetText"]');
+    const time = node.querySelector('a[href*="/status/"] time');
+    const link = time ? time.closest('a') : node.querySelector('a[href*="/status/"]');
+
+    let handle = null;
+    const userName = node.querySelector('div[data-testid="User-Name"]');
+    if (userName) {
+        for (const span of userName.querySelectorAll('span')) {
+            const text = span.textContent.trim();
+            if (text.startsWith('@')) {
+                handle = text;
+                break;
+            }
+        }
+    }
+
+    // Engagement buttons carry exact counts in their aria-labels ("1,234 Likes. Like")
+    const count = function(selector) {
+        const element = node.querySelector(selector);
+        const label = element ? (element.getAttribute('aria-label') || '') : '';
+        const match = label.match(/(\\d[\\d,]*)/);
+        return match ? parseInt(match[1].replace(/,/g, ''), 10) : 0;
+    };
+
+    return {
+        text: textElement ? textElement.innerText : null,
+        href: link ? link.getAttribute('href') : null,
+        handle: handle,
+        verified: !!node.querySelector('svg[data-testid="icon-verified"]'),
+        posted_at: time ? time.getAttribute('datetime') : null,
+        replies: count('[data-testid="reply"]'),
+        reposts: count('[data-testid="retweet"], [data-testid="unretweet"]'),
+        likes: count('[data-testid="like"], [data-testid="unlike"]'),
+        views: count('a[href$="/analytics"]')
+    };
+}"""
+
+async def extract_tweet_record(tweet):
+    """Read text, permalink, author, verification and engagement from an article in one round trip.
+
+    Returns None for articles without tweet text.
+    """
+    data = await tweet.evaluate(EXTRACT_TWEET_JS)
+    text = (data.get("text") or "").strip()
+    if not text:
+        return None
+
+    match = re.search(r'/status/(\d+)', data.get("href") or "")
+    return {
+        "id": match.group(1) if match else None,
+        "url": f"https://x.com{data['href']}" if data.get("href") else None,
+        "text": text,
+        "author": data.get("handle"),
+        "verified": data.get("verified", False),
+        "posted_at": data.get("posted_at"),
+        "replies": data.get("replies", 0),
+        "reposts": data.get("reposts", 0),
+        "likes": data.get("likes", 0),
+        "views": data.get("views", 0),
+        "element": tweet
+    }
+
+KEYWORD_PATTERNS = [(keyword, re.compile(r'\b' + re.escape(keyword.lower()) + r'\b')) for keyword in KEYWORDS]
+
+def match_keywords(text):
+    """Configured keywords that appear in the text as whole words"""
+    lowered = text.lower()
+    return [keyword for keyword, pattern in KEYWORD_PATTERNS if pattern.search(lowered)]
+
+# ---------------------- 🎯 LOCAL RELEVANCE SCORING ----------------------
+SCORING_STOPWORDS = ENGLISH_STOPWORDS | {"just", "about", "more", "all", "their", "there", "out", "up", "its", "rt"}
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9'_-]+")
+
+def tokenize(text):
+    """Lowercased content words with URLs and mentions removed"""
+    text = re.sub(r'https?://\S+|@\w+', ' ', text.lower())
+    return [token for token in TOKEN_PATTERN.findall(text) if token not in SCORING_STOPWORDS]
+
+class RelevanceScorer:
+    """CPU-only ranking of reply candidates before any LLM call is spent.
+
+    Combines keyword weights, TF-IDF cosine similarity to the topic profile, text
+    length and engagement into one score in [0, 1]. Document frequencies are
+    learned from every tweet seen this run; the profile vector and IDF table are
+    built once per batch and shared by all candidates in the scroll.
+    """
+
+    def __init__(self, profile, keyword_weights, weights, max_docs=5000):
+        self.profile_counts = Counter(tokenize(profile or " ".join(KEYWORDS)))
+        self.keyword_weights = {k.lower(): v for k, v in keyword_weights.items()}
+        self.weights = weights
+        self.max_docs = max_docs
+        self.doc_freq = Counter()
+        self.doc_count = 0
+
+    def observe(self, texts):
+        """Update document frequencies with newly seen tweets"""
+        for text in texts:
+            self.doc_freq.update(set(tokenize(text)))
+            self.doc_count += 1
+        if self.doc_count > self.max_docs:
+            # Decay instead of growing without bound; keeps IDF tracking the recent timeline
+            self.doc_freq = Counter({t: c // 2 for t, c in self.doc_freq.items() if c > 1})
+            self.doc_count //= 2
+
+    def score_batch(self, records):
+        """Score all candidates of a scroll in place and return them best first"""
+        if not records:
+            return []
+        idf_cache = {}
+
+        def idf(token):
+            value = idf_cache.get(token)
+            if value is None:
+                value = math.log((1 + self.doc_count) / (1 + self.doc_freq[token])) + 1
+                idf_cache[token] = value
+            return value
+
+        profile = {t: c * idf(t) for t, c in self.profile_counts.items()}
+        profile_norm = math.sqrt(sum(v * v for v in profile.values())) or 1.0
+        total_weight = sum(self.weights.values()) or 1.0
+        engagement_scale = math.log1p(5000)
+
+        for record in records:
+            counts = Counter(tokenize(record["text"]))
+            vector = {t: c * idf(t) for t, c in counts.items()}
+            norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+            topic = sum(w * profile.get(t, 0.0) for t, w in vector.items()) / (norm * profile_norm)
+
+            keyword_mass = sum(self.keyword_weights.get(k.lower(), 1.0) for k in record.get("keywords", []))
+            engagement = record["likes"] + 2 * record["reposts"] + 3 * record["replies"]
+            parts = {
+                "keywords": 1 - math.exp(-keyword_mass),
+                "topic": topic,
+                "length": min(len(record["text"]) / 140, 1.0),
+                "engagement": min(math.log1p(engagement) / engagement_scale, 1.0)
+            }
+            record["score"] = round(sum(self.weights.get(k, 0) * v for k, v in parts.items()) / total_weight, 4)
+            record["score_parts"] = {k: round(v, 3) for k, v in parts.items()}
+
+        return sorted(records, key=lambda r: r["score"], reverse=True)
+
+relevance_scorer = RelevanceScorer(TOPIC_PROFILE, KEYWORD_WEIGHTS, SCORE_WEIGHTS)
+scoring_stats = {"scored": 0, "selected": 0, "below_threshold": 0, "over_scroll_limit": 0}
+
+# ---------------------- 🗂️ CANDIDATE SCHEDULER ----------------------
+def tweet_timestamp(record):
+    """Epoch seconds the tweet was posted, falling back to when it was queued"""
+    posted_at = record.get("posted_at")
+    if posted_at:
+        try:
+            return datetime.fromisoformat(posted_at.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            pass
+    return record["queued_at"]
+
+class CandidateQueue:
+    """Bounded priority queue of reply candidates collected across scrolls.
+
+    Priority is the relevance score decayed by tweet age with a fixed half-life.
+    Every entry decays at the same rate, so relative order never changes and the
+    decay folds into a static heap key. Tweets older than max_age are dropped;
+    when full, the weakest entry makes room for a stronger one. Draining is paced
+    by reply_interval, independently of how fast the timeline is scanned; the
+    reply actor awaits get(), which wakes on the next push.
+    """
+
+    def __init__(self, max_size=50, max_age=7200, half_life=2700, reply_interval=45, max_seen=5000):
+        self.max_size = max_size
+        self.max_seen = max_seen
+        self.max_age = max_age
+        self.half_life = half_life
+        self.reply_interval = reply_interval
+        self._heap = []
+        # Identities ever pushed, newest last; capped like the checkpoint's processed ids
+        self._seen = OrderedDict()
+        self._sequence = 0
+        self._next_dispatch = 0.0
+        self._pushed = asyncio.Event()
+        self.stats = {"enqueued": 0, "dequeued": 0, "duplicates": 0, "dropped_full": 0,
+                      "dropped_expired": 0, "wait_total": 0.0, "wait_max": 0.0}
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _key(self, record):
+        return math.log(max(record["score"], 1e-6)) + math.log(2) * tweet_timestamp(record) / self.half_life
+
+    def _expired(self, record, now):
+        return now - tweet_timestamp(record) > self.max_age
+
+    def _drop(self, record, reason):
+        self.stats[f"dropped_{reason}"] += 1
+        event_log.emit("candidate_dropped", tweet_id=record["id"], reason=reason, score=record["score"])
+
+    def push(self, record):
+        """Queue a candidate; returns False if it was a duplicate or dropped"""
+        now = time.time()
+        identity = record["id"] or record["text"]
+        if identity in self._seen:
+            self._seen.move_to_end(identity)
+            self.stats["duplicates"] += 1
+            return False
+        self._seen[identity] = None
+        while len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+        record["queued_at"] = now
+
+        if self._expired(record, now):
+            self._drop(record, "expired")
+            return False
+
+        key = self._key(record)
+        if len(self._heap) >= self.max_size:
+            worst = max(range(len(self._heap)), key=lambda i: self._heap[i][0])
+            if -self._heap[worst][0] >= key:
+                self._drop(record, "full")
+                return False
+            evicted = self._heap[worst][2]
+            self._heap[worst] = self._heap[-1]
+            self._heap.pop()
+            heapq.heapify(self._heap)
+            self._drop(evicted, "full")
+
+        self._sequence += 1
+        heapq.heappush(self._heap, (-key, self._sequence, record))
+        self._pushed.set()
+        self.stats["enqueued"] += 1
+        event_log.emit("candidate_queued", tweet_id=record["id"], score=record["score"], depth=len(self._heap))
+        return True
+
+    def pop(self):
+        """Best non-expired candidate, or None once the queue is empty"""
+        now = time.time()
+        while self._heap:
+            record = heapq.heappop(self._heap)[2]
+            if self._expired(record, now):
+                self._drop(record, "expired")
+                continue
+            wait = now - record["queued_at"]
+            self.stats["dequeued"] += 1
+            self.stats["wait_total"] += wait
+            self.stats["wait_max"] = max(self.stats["wait_max"], wait)
+            return record
+        return None
+
+    async def get(self):
+        """Wait for the pacing interval and a candidate, then return the best one"""
+        while True:
+            delay = self._next_dispatch - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            record = self.pop()
+            if record is not None:
+                return record
+            self._pushed.clear()
+            await self._pushed.wait()
+
+    def pending(self):
+        """Queued records, best first"""
+        return [entry[2] for entry in sorted(self._heap)]
+
+    def record_dispatch(self):
+        """Start the pacing interval after a reply attempt that reached generation"""
+        self._next_dispatch = time.time() + self.reply_interval * random.uniform(0.8, 1.2)
+
+    def snapshot(self):
+        dequeued = self.stats["dequeued"]
+        return {
+            "depth": len(self._heap),
+            "enqueued": self.stats["enqueued"],
+            "dequeued": dequeued,
+            "duplicates": self.stats["duplicates"],
+            "dropped_full": self.stats["dropped_full"],
+            "dropped_expired": self.stats["dropped_expired"],
+            "avg_wait_s": round(self.stats["wait_total"] / dequeued, 1) if dequeued else None,
+            "max_wait_s": round(self.stats["wait_max"], 1),
+            "next_dispatch_in_s": round(max(0.0, self._next_dispatch - time.time()), 1)
+        }
+
+candidate_queue = CandidateQueue(
+    max_size=CANDIDATE_QUEUE.get("max_size", 50),
+    max_age=CANDIDATE_QUEUE.get("max_age_minutes", 120) * 60,
+    half_life=CANDIDATE_QUEUE.get("freshness_half_life_minutes", 45) * 60,
+    reply_interval=CANDIDATE_QUEUE.get("reply_interval", 45)
+)
+
+# ---------------------- 🧬 NEAR-DUPLICATE DETECTION ----------------------
+def simhash(words):
+    """64-bit SimHash over word unigrams and bigrams"""
+    features = Counter(words)
+    features.update(" ".join(pair) for pair in zip(words, words[1:]))
+    totals = [0] * 64
+    for feature, weight in features.items():
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            totals[bit] += weight if value >> bit & 1 else -weight
+    return sum(1 << bit for bit in range(64) if totals[bit] > 0)
+
+class NearDuplicateIndex:
+    """Bounded SimHash index that remembers what was decided for each tweet.
+
+    Lookups split the 64-bit fingerprint into max_distance + 1 bands; any two
+    fingerprints within max_distance bits must agree exactly on at least one band,
+    so only the few entries sharing a band are compared. The oldest fingerprints
+    are evicted once max_entries is reached.
+    """
+
+    def __init__(self, max_distance=3, max_entries=5000, min_words=5):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.min_words = min_words
+        self.band_count = max_distance + 1
+        self.band_bits = 64 // self.band_count
+        self._entries = OrderedDict()  # fingerprint -> {"tweet_id", "decision"}
+        self._bands = [{} for _ in range(self.band_count)]
+        self.stats = {"checked": 0, "near_duplicates": 0, "skipped": Counter()}
+
+    def fingerprint(self, text):
+        """SimHash of the normalized text, or None if it's too short to compare reliably"""
+        text = re.sub(r'https?://\S+|@\w+|#', ' ', text.lower())
+        words = re.findall(r"[a-z0-9']+", text)
+        if len(words) < self.min_words:
+            return None
+        return simhash(words)
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [fingerprint >> (band * self.band_bits) & mask for band in range(self.band_count)]
+
+    def lookup(self, fingerprint, tweet_id=None):
+        """Earlier entry within max_distance bits of the fingerprint, ignoring the same tweet"""
+        if fingerprint is None:
+            return None
+        self.stats["checked"] += 1
+        candidates = set()
+        for band, key in enumerate(self._band_keys(fingerprint)):
+            candidates.update(self._bands[band].get(key, ()))
+        for other in candidates:
+            entry = self._entries[other]
+            if entry["tweet_id"] != tweet_id and bin(fingerprint ^ other).count("1") <= self.max_distance:
+                self.stats["near_duplicates"] += 1
+                return entry
+        return None
+
+    def remember(self, fingerprint, tweet_id, decision):
+        """Store or update the decision made for a fingerprint"""
+        if fingerprint is None:
+            return
+        if fingerprint in self._entries:
+            self._entries[fingerprint].update(tweet_id=tweet_id, decision=decision)
+            self._entries.move_to_end(fingerprint)
+            return
+        if len(self._entries) >= self.max_entries:
+            oldest, _ = self._entries.popitem(last=False)
+            for band, key in enumerate(self._band_keys(oldest)):
+                bucket = self._bands[band].get(key)
+                bucket.discard(oldest)
+                if not bucket:
+                    del self._bands[band][key]
+        self._entries[fingerprint] = {"tweet_id": tweet_id, "decision": decision}
+        for band, key in enumerate(self._band_keys(fingerprint)):
+            self._bands[band].setdefault(key, set()).add(fingerprint)
+
+    def record_skip(self, decision):
+        self.stats["skipped"][decision] += 1
+
+    def snapshot(self):
+        return {
+            "entries": len(self._entries),
+            "checked": self.stats["checked"],
+            "near_duplicates": self.stats["near_duplicates"],
+            "skipped": dict(self.stats["skipped"])
+        }
+
+near_duplicates = NearDuplicateIndex(
+    max_distance=NEAR_DUPLICATES.get("max_distance", 3),
+    max_entries=NEAR_DUPLICATES.get("max_entries", 5000),
+    min_words=NEAR_DUPLICATES.get("min_words", 5)
+)
+
+# ---------------------- ⏱️ ADAPTIVE TIMEOUTS ----------------------
+class LatencyTracker:
+    """Per-operation timeouts learned from how long operations really take.
+
+    Keeps a rolling window of durations per operation. The effective timeout is
+    a high percentile of the window times a safety margin, clamped to the
+    configured bounds; until min_samples exist the starting timeout is used.
+    Timed-out attempts are recorded at the timeout they hit, so a connection
+    that is getting slower pushes its timeouts up instead of failing forever.
+    """
+
+    def __init__(self, defaults, percentile=0.95, margin=1.5, window=50, min_samples=5, bounds=None):
+        self.defaults = defaults
+        self.percentile = percentile
+        self.margin = margin
+        self.min_samples = min_samples
+        self.bounds = bounds or {}
+        self.samples = {op: deque(maxlen=window) for op in defaults}
+        self.timeouts = Counter()
+
+    def timeout(self, op):
+        """Current timeout in seconds for an operation"""
+        samples = self.samples[op]
+        if len(samples) < self.min_samples:
+            return self.defaults[op]
+        ordered = sorted(samples)
+        observed = ordered[max(0, math.ceil(self.percentile * len(ordered)) - 1)]
+        low, high = self.bounds.get(op, (0, float("inf")))
+        return round(min(max(observed * self.margin, low), high), 2)
+
+    def observe(self, op, seconds, ok=True):
+        """Record one attempt; failures count as taking at least their timeout"""
+        self.samples[op].append(seconds)
+        if not ok:
+            self.timeouts[op] += 1
+
+    def snapshot(self):
+        return {op: {"timeout_s": self.timeout(op), "samples": len(self.samples[op]), "timeouts": self.timeouts[op]}
+                for op in self.defaults}
+
+latency_tracker = LatencyTracker(
+    {
+        "home_load": HOME_PAGE_LOAD_TIMEOUT,
+        "tweet_poll": TWEET_POLL_TIMEOUT,
+        "login_check": LOGIN_CHECK_TIMEOUT,
+        "dialog": DIALOG_DETECTION_TIMEOUT,
+        "submission": REPLY_SUBMISSION_TIMEOUT
+    },
+    percentile=ADAPTIVE_TIMEOUTS.get("percentile", 0.95),
+    margin=ADAPTIVE_TIMEOUTS.get("margin", 1.5),
+    window=ADAPTIVE_TIMEOUTS.get("window", 50),
+    min_samples=ADAPTIVE_TIMEOUTS.get("min_samples", 5),
+    bounds=ADAPTIVE_TIMEOUTS.get("bounds")
+)
 
 # ---------------------- 🔑 LOGIN FUNCTIONALITY ----------------------
+# Waits go through locators: wait_for_selector would hand back an ElementHandle nobody disposes
+HOME_TIMELINE_SELECTOR = 'div[aria-label="Home timeline"], div[aria-label="Timeline: Home"]'
+
 async def check_login_status(page):
     """Check if we're already logged in"""
-    print("🔍 Checking login status...")
+    log("🔍 Checking login status...")
     
     # Check if we're on the home page
     current_url = page.url
     if "twitter.com/home" in current_url or "x.com/home" in current_url:
         try:
             # Look for elements that would only be present when logged in
-            await page.wait_for_selector('div[aria-label="Home timeline"], div[aria-label="Timeline: Home"]', 
-                                        timeout=5000)
-            print("✅ Already logged in!")
+            started = time.time()
+            await page.locator(HOME_TIMELINE_SELECTOR).first.wait_for(timeout=latency_tracker.timeout("login_check") * 1000)
+            # Only successes are samples: a logged-out session never shows the timeline at all
+            latency_tracker.observe("login_check", time.time() - started)
+            log("✅ Already logged in!")
             return True
         except Exception:
-            print("⚠️ On home page but timeline not found. May need to log in.")
+            log("⚠️ On home page but timeline not found. May need to log in.", "warning")
     
-    print("⚠️ Not logged in.")
+    log("⚠️ Not logged in.", "warning")
     return False
 
+AUTH_COOKIES = ("auth_token", "ct0")
+auth_state = {"checked_at": None, "logged_in": None, "reason": None, "expires_in_h": None}
+
+def has_credentials():
+    return bool(X_USERNAME and X_PASSWORD) and X_USERNAME != "your_username" and X_PASSWORD != "your_password"
+
+async def check_auth_cookies(context):
+    """Decide login state from the context's cookies, without loading any page.
+
+    Returns (logged_in, reason); auth_state keeps the latest result for the stats.
+    """
+    now = time.time()
+    cookies = {c["name"]: c for c in await context.cookies(["https://x.com"]) if c["name"] in AUTH_COOKIES}
+    # expires is -1 for session cookies
+    expiries = [c["expires"] for c in cookies.values() if c.get("expires", -1) > 0]
+    missing = [name for name in AUTH_COOKIES if name not in cookies]
+
+    if missing:
+        logged_in, reason = False, f"no {' / '.join(missing)} cookie"
+    elif expiries and min(expiries) <= now:
+        logged_in, reason = False, "auth cookie expired"
+    else:
+        logged_in, reason = True, "auth cookies valid"
+
+    expires_in_h = round((min(expiries) - now) / 3600, 1) if logged_in and expiries else None
+    auth_state.update(checked_at=now, logged_in=logged_in, reason=reason, expires_in_h=expires_in_h)
+    return logged_in, reason
+
 async def login_to_x(page, username, password):
     """Log in to X with provided credentials"""
-    print("🔑 Attempting to log in to X...")
+    log("🔑 Attempting to log in to X...")
     
     try:
         # Navigate to X login page
         await page.goto("https://twitter.com/i/flow/login", wait_until="domcontentloaded")
         
         # Wait for the page to load and username field to be visible
-        await page.wait_for_selector('input[autocomplete="username"]', timeout=10000)
+        await page.locator('input[autocomplete="username"]').first.wait_for(timeout=10000)
         
         # Enter username with human-like typing
         await human_like_typing(page, 'input[autocomplete="username"]', username)
@@ -176,19 +1736,19 @@ async def login_to_x(page, username, password):
         
         # Check if we need to enter additional verification
         try:
-            unusual_activity = await page.query_selector('div:has-text("We need to confirm you\'re not a robot")')
+            unusual_activity = await page.locator('div:has-text("We need to confirm you\'re not a robot")').count()
             if unusual_activity:
-                print("⚠️ X is asking for verification. Please complete this manually.")
-                print("The script will wait for you to complete verification and reach the home page.")
-                await page.wait_for_selector('div[aria-label="Home timeline"], div[aria-label="Timeline: Home"]', 
-                                           timeout=120000)  # 2 minute timeout for manual verification
+                log("⚠️ X is asking for verification. Please complete this manually.", "warning")
+                log("The script will wait for you to complete verification and reach the home page.")
+                # 2 minute timeout for manual verification
+                await page.locator(HOME_TIMELINE_SELECTOR).first.wait_for(timeout=120000)
                 return True
         except Exception:
             # No verification needed, continue with normal login
             pass
         
         # Wait for password field
-        await page.wait_for_selector('input[type="password"]', timeout=10000)
+        await page.locator('input[type="password"]').first.wait_for(timeout=10000)
         
         # Enter password with human-like typing
         await human_like_typing(page, 'input[type="password"]', password)
@@ -198,164 +1758,454 @@ async def login_to_x(page, username, password):
         await page.click('div[role="button"] div:has-text("Log in")')
         
         # Wait for the home timeline to load
-        await page.wait_for_selector('div[aria-label="Home timeline"], div[aria-label="Timeline: Home"]', 
-                                   timeout=30000)
+        await page.locator(HOME_TIMELINE_SELECTOR).first.wait_for(timeout=30000)
         
-        print("✅ Successfully logged in to X!")
+        log("✅ Successfully logged in to X!")
         return True
         
     except Exception as e:
-        print(f"⚠️ Login failed: {e}")
+        log(f"⚠️ Login failed: {e}", "warning")
         return False
 
 # ---------------------- 🌐 HOME PAGE LOADING CHECK ----------------------
-async def wait_for_home_page_loaded(page, timeout=HOME_PAGE_LOAD_TIMEOUT):
+async def wait_for_home_page_loaded(page, timeout=None):
     """Wait for the X home page to be fully loaded with tweets visible"""
-    print("⏳ Waiting for X home page to be fully loaded...")
+    log("⏳ Waiting for X home page to be fully loaded...")
+    timeout = timeout or latency_tracker.timeout("home_load")
     
+    started = time.time()
     try:
         # Wait for the home timeline container
-        await page.wait_for_selector('div[aria-label="Home timeline"], div[aria-label="Timeline: Home"]', 
-                                   timeout=timeout * 1000)
-        
-        # Wait for tweets to be visible
-        await page.wait_for_selector('article[data-testid="tweet"]', timeout=30000)
-        
-        # Wait for at least 3 tweets to be loaded to ensure the page is properly populated
-        for attempt in range(10):  # Try up to 10 times
-            tweets = await page.query_selector_all('article[data-testid="tweet"]')
-            if len(tweets) >= 3:
-                print(f"✅ Home page fully loaded with {len(tweets)} tweets visible!")
+        await page.locator(HOME_TIMELINE_SELECTOR).first.wait_for(timeout=timeout * 1000)
+    except Exception as e:
+        latency_tracker.observe("home_load", timeout, ok=False)
+        log(f"⚠️ Error while waiting for home page: {e}", "warning")
+        return False
+    latency_tracker.observe("home_load", time.time() - started)
+    
+    # Wait for at least 3 tweets to be loaded to ensure the page is properly populated
+    poll_timeout = latency_tracker.timeout("tweet_poll")
+    started = time.time()
+    tweet_count = 0
+    try:
+        while time.time() - started < poll_timeout:
+            tweet_count = await page.locator('article[data-testid="tweet"]').count()
+            if tweet_count >= 3:
+                latency_tracker.observe("tweet_poll", time.time() - started)
+                log(f"✅ Home page fully loaded with {tweet_count} tweets visible!")
                 return True
-            
-            print(f"⏳ Only {len(tweets)} tweets loaded, waiting for more...")
-            await asyncio.sleep(2)  # Wait a bit more for tweets to load
-        
-        # If we get here, we have some tweets but maybe not as many as expected
-        print("⚠️ Home page loaded but with fewer tweets than expected. Continuing anyway...")
-        return True
-        
+            await asyncio.sleep(0.5)  # Wait a bit more for tweets to load
     except Exception as e:
-        print(f"⚠️ Error while waiting for home page: {e}")
+        log(f"⚠️ Error while waiting for tweets: {e}", "warning")
         return False
-
+    latency_tracker.observe("tweet_poll", poll_timeout, ok=False)
+    
+    if tweet_count == 0:
+        log(f"⚠️ No tweets rendered after {poll_timeout:.1f}s", "warning")
+        return False
+    
+    # If we get here, we have some tweets but maybe not as many as expected
+    log(f"⚠️ Home page loaded but only {tweet_count} tweets visible. Continuing anyway...", "warning")
+    return True
+
+# ---------------------- 🧭 READINESS-DRIVEN SCROLLING ----------------------
+TIMELINE_STATE_JS = """function() {
+    if (!window.__timelineWatch) {
+        const watch = {lastMutation: Date.now()};
+        new MutationObserver(function() { watch.lastMutation = Date.now(); })
+            .observe(document.body, {childList: true, subtree: true});
+        window.__timelineWatch = watch;
+    }
+    const ids = [];
+    for (const time of document.querySelectorAll('article[data-testid="tweet"] a[href*="/status/"] time')) {
+        const match = (time.closest('a').getAttribute('href') || '').match(/\\/status\\/(\\d+)/);
+        if (match) ids.push(match[1]);
+    }
+    return {ids: ids, quietMs: Date.now() - window.__timelineWatch.lastMutation};
+}"""
+
+TIMELINE_RESPONSE_PATTERN = re.compile(r'/graphql/[^/]+/(HomeTimeline|HomeLatestTimeline|SearchTimeline)')
+
+class TimelineWatcher:
+    """Counts completed timeline GraphQL responses so a scroll can tell when its page of tweets arrived"""
+
+    def __init__(self):
+        self.responses = 0
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        if TIMELINE_RESPONSE_PATTERN.search(response.url):
+            self.responses += 1
+
+timeline_watcher = TimelineWatcher()
+scroll_stats = {"scrolls": 0, "new_tweets": 0, "wait_total": 0.0, "reasons": Counter()}
+
+async def scroll_timeline(page, seen_ids):
+    """Scroll once, then wait for the timeline to be ready instead of sleeping a fixed time.
+
+    Ready means the DOM has been quiet for quiet_ms after new articles or a timeline
+    response arrived, or quiet for idle_quiet_ms when nothing new came. The wait is
+    never shorter than MIN_SCROLL_DELAY nor longer than MAX_SCROLL_DELAY.
+    Returns (new_tweets, waited_seconds, reason).
+    """
+    quiet_ms = SCROLL_READINESS.get("quiet_ms", 400)
+    idle_quiet_ms = SCROLL_READINESS.get("idle_quiet_ms", 1500)
+    poll_interval = SCROLL_READINESS.get("poll_interval", 0.25)
+
+    state = await page.evaluate(TIMELINE_STATE_JS)
+    seen_ids.update(state["ids"])
+    responses_before = timeline_watcher.responses
+
+    start = time.time()
+    scroll_amount = random.randint(500, 1000)
+    await page.evaluate("""function(scrollAmount) {
+        window.scrollBy(0, scrollAmount);
+    }""", scroll_amount)
+
+    new_ids = set()
+    reason = "max_wait"
+    while should_continue():
+        await asyncio.sleep(poll_interval)
+        elapsed = time.time() - start
+        state = await page.evaluate(TIMELINE_STATE_JS)
+        new_ids = set(state["ids"]) - seen_ids
+        if elapsed >= MAX_SCROLL_DELAY:
+            break
+        if elapsed < MIN_SCROLL_DELAY:
+            continue
+        if state["quietMs"] >= quiet_ms and new_ids:
+            reason = "new_tweets"
+            break
+        if state["quietMs"] >= quiet_ms and timeline_watcher.responses > responses_before:
+            reason = "timeline_response"
+            break
+        if state["quietMs"] >= idle_quiet_ms:
+            reason = "dom_quiet"
+            break
+
+    waited = time.time() - start
+    seen_ids.update(new_ids)
+    scroll_stats["scrolls"] += 1
+    scroll_stats["new_tweets"] += len(new_ids)
+    scroll_stats["wait_total"] += waited
+    scroll_stats["reasons"][reason] += 1
+    return len(new_ids), waited, reason
+
+def scroll_snapshot():
+    scrolls = scroll_stats["scrolls"]
+    return {
+        "scrolls": scrolls,
+        "new_tweets": scroll_stats["new_tweets"],
+        "avg_new_tweets": round(scroll_stats["new_tweets"] / scrolls, 1) if scrolls else None,
+        "avg_wait_s": round(scroll_stats["wait_total"] / scrolls, 2) if scrolls else None,
+        "reasons": dict(scroll_stats["reasons"])
+    }
+
+class IdleBackoff:
+    """Exponential backoff for quiet timelines.
+
+    A scroll is idle when it brought no new tweets or none of them matched a
+    keyword. Each consecutive idle scroll doubles the extra wait before the next
+    one, up to max_wait; after refresh_after scrolls with no new tweets at all the
+    timeline is reloaded instead of scrolled further. One productive scroll
+    restores the normal cadence.
+    """
+
+    def __init__(self, base_wait=10, max_wait=300, refresh_after=3):
+        self.base_wait = base_wait
+        self.max_wait = max_wait
+        self.refresh_after = refresh_after
+        self.idle_streak = 0
+        self.dry_streak = 0
+        self.stats = {"idle_scrolls": 0, "refreshes": 0, "backoff_total": 0.0}
+
+    def observe(self, new_tweets, matched):
+        """Record one scroll's yield"""
+        self.dry_streak = self.dry_streak + 1 if new_tweets == 0 else 0
+        if new_tweets == 0 or matched == 0:
+            self.idle_streak += 1
+            self.stats["idle_scrolls"] += 1
+        else:
+            if self.idle_streak:
+                log(f"🌊 Timeline yielding again after {self.idle_streak} idle scrolls")
+            self.idle_streak = 0
+
+    def delay(self):
+        """Extra seconds to wait before the next scroll (0 at normal cadence)"""
+        if not self.idle_streak:
+            return 0.0
+        wait = min(self.base_wait * 2 ** (self.idle_streak - 1), self.max_wait)
+        return wait * random.uniform(0.8, 1.2)
+
+    def should_refresh(self):
+        return self.refresh_after and self.dry_streak >= self.refresh_after
+
+    def record_refresh(self):
+        self.dry_streak = 0
+        self.stats["refreshes"] += 1
+
+    def snapshot(self):
+        return {
+            "idle_streak": self.idle_streak,
+            "idle_scrolls": self.stats["idle_scrolls"],
+            "refreshes": self.stats["refreshes"],
+            "backoff_total_s": round(self.stats["backoff_total"], 1)
+        }
+
+idle_backoff = IdleBackoff(
+    base_wait=IDLE_BACKOFF.get("base_wait", 10),
+    max_wait=IDLE_BACKOFF.get("max_wait", 300),
+    refresh_after=IDLE_BACKOFF.get("refresh_after", 3)
+)
+
+async def idle_wait(seconds):
+    """Sleep for an idle backoff, waking early if a stop is requested"""
+    deadline = time.time() + seconds
+    while should_continue() and time.time() < deadline:
+        await asyncio.sleep(min(1.0, deadline - time.time()))
+        mark_progress()
+    idle_backoff.stats["backoff_total"] += seconds - max(0.0, deadline - time.time())
+
+async def refresh_timeline(page):
+    """Reload the home timeline to pick up fresh tweets instead of scrolling a dry one"""
+    log("🔄 Timeline ran dry, refreshing home...")
+    idle_backoff.record_refresh()
+    event_log.emit("timeline_refreshed", idle_streak=idle_backoff.idle_streak)
+    try:
+        await page.goto("https://x.com/home", wait_until="domcontentloaded")
+        return await wait_for_home_page_loaded(page)
+    except Exception as e:
+        log_error("refresh", e)
+        return False
+
+# ---------------------- 📡 NETWORK TIMELINE INGESTION ----------------------
+def iter_timeline_tweets(node):
+    """Tweet result objects of a timeline response in document order, skipping promoted entries"""
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            stack.extend(reversed(item))
+        elif isinstance(item, dict) and "promotedMetadata" not in item:
+            if item.get("__typename") in ("Tweet", "TweetWithVisibilityResults"):
+                # Quoted tweets nested inside are not timeline entries of their own
+                yield item
+            else:
+                stack.extend(reversed(list(item.values())))
+
+def parse_tweet_result(result):
+    """Compact record (same shape as extract_tweet_record) from a GraphQL tweet result"""
+    if result.get("__typename") == "TweetWithVisibilityResults":
+        result = result.get("tweet") or {}
+    legacy = result.get("legacy") or {}
+
+    # A repost's content (and reply target) is the original tweet
+    retweeted = (legacy.get("retweeted_status_result") or {}).get("result")
+    if retweeted:
+        return parse_tweet_result(retweeted)
+
+    tweet_id = result.get("rest_id") or legacy.get("id_str")
+    note = ((result.get("note_tweet") or {}).get("note_tweet_results") or {}).get("result") or {}
+    text = note.get("text")
+    if not text:
+        # Drop leading @mentions of replies and trailing media links like the rendered tweet does
+        # (the range counts entities like &amp; as one character)
+        text = html.unescape(legacy.get("full_text") or "")
+        start, end = legacy.get("display_text_range") or (0, len(text))
+        text = text[start:end]
+    text = text.strip()
+    if not tweet_id or not text:
+        return None
+
+    user = ((result.get("core") or {}).get("user_results") or {}).get("result") or {}
+    user_legacy = user.get("legacy") or {}
+    screen_name = (user.get("core") or {}).get("screen_name") or user_legacy.get("screen_name")
+
+    posted_at = None
+    if legacy.get("created_at"):
+        try:
+            posted_at = datetime.strptime(legacy["created_at"], "%a %b %d %H:%M:%S %z %Y").isoformat()
+        except ValueError:
+            pass
+
+    return {
+        "id": tweet_id,
+        "url": f"https://x.com/{screen_name or 'i'}/status/{tweet_id}",
+        "text": text,
+        "author": f"@{screen_name}" if screen_name else None,
+        "verified": bool(user.get("is_blue_verified") or user_legacy.get("verified")),
+        "posted_at": posted_at,
+        "replies": legacy.get("reply_count", 0),
+        "reposts": legacy.get("retweet_count", 0),
+        "likes": legacy.get("favorite_count", 0),
+        "views": int((result.get("views") or {}).get("count") or 0),
+        "element": None
+    }
+
+class TimelineIngestor:
+    """Builds tweet records from the timeline JSON the web client already downloads.
+
+    Each timeline response is parsed as soon as it arrives and only the compact
+    records are kept; the main loop drains them instead of scraping articles, so
+    the DOM is only touched to find the reply control of a chosen tweet.
+    """
+
+    def __init__(self, max_pending=1000, max_emitted=20000):
+        self._pending = OrderedDict()
+        # Ids already handed out, newest last; older ones fall back on the checkpoint's known ids
+        self._emitted = OrderedDict()
+        self.max_pending = max_pending
+        self.max_emitted = max_emitted
+        self.stats = {"responses": 0, "tweets": 0, "errors": 0, "parse_seconds": 0.0}
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+
+    def active(self):
+        """Network records are used once at least one timeline response has parsed"""
+        return INGESTION_MODE == "network" and self.stats["responses"] > 0
+
+    async def _on_response(self, response):
+        if not TIMELINE_RESPONSE_PATTERN.search(response.url) or response.status != 200:
+            return
+        try:
+            payload = await response.json()
+        except Exception as e:
+            self.stats["errors"] += 1
+            log(f"⚠️ Could not read timeline response: {e}", "debug")
+            return
+
+        started = time.perf_counter()
+        for result in iter_timeline_tweets(payload):
+            try:
+                record = parse_tweet_result(result)
+            except Exception as e:
+                self.stats["errors"] += 1
+                log(f"⚠️ Could not parse timeline tweet: {e}", "debug")
+                continue
+            if not record:
+                continue
+            if record["id"] in self._emitted:
+                self._emitted.move_to_end(record["id"])
+                continue
+            self._emitted[record["id"]] = None
+            self._pending[record["id"]] = record
+            self.stats["tweets"] += 1
+        while len(self._pending) > self.max_pending:
+            self._pending.popitem(last=False)
+        while len(self._emitted) > self.max_emitted:
+            self._emitted.popitem(last=False)
+        self.stats["responses"] += 1
+        self.stats["parse_seconds"] += time.perf_counter() - started
+
+    def drain(self):
+        """Records that arrived since the last drain, oldest first"""
+        records = list(self._pending.values())
+        self._pending.clear()
+        return records
+
+    def snapshot(self):
+        tweets = self.stats["tweets"]
+        return {
+            "mode": "network" if self.active() else "dom",
+            "responses": self.stats["responses"],
+            "tweets": tweets,
+            "errors": self.stats["errors"],
+            "parse_us_per_tweet": round(self.stats["parse_seconds"] * 1e6 / tweets) if tweets else None
+        }
+
+timeline_ingestor = TimelineIngestor()
+
 # ---------------------- 🔍 IMPROVED ELEMENT FINDING ----------------------
 async def find_reply_button(tweet, page):
     """Find the reply button using multiple strategies"""
-    if DEBUG_MODE:
-        print("🔍 Looking for reply button...")
+    log("🔍 Looking for reply button...", "debug")
     
     # Strategy 1: Try data-testid attribute (original approach)
     try:
         reply_button = await tweet.query_selector('div[data-testid="reply"]')
         if reply_button:
-            if DEBUG_MODE:
-                print("✅ Found reply button using data-testid")
+            log("✅ Found reply button using data-testid", "debug")
             return reply_button
     except Exception as e:
-        if DEBUG_MODE:
-            print(f"⚠️ Strategy 1 failed: {e}")
+        log(f"⚠️ Strategy 1 failed: {e}", "debug")
     
     # Strategy 2: Try aria-label attribute
     try:
         reply_button = await tweet.query_selector('div[aria-label="Reply"], div[aria-label="reply"], div[aria-label="Comment"], div[aria-label="comment"]')
         if reply_button:
-            if DEBUG_MODE:
-                print("✅ Found reply button using aria-label")
+            log("✅ Found reply button using aria-label", "debug")
             return reply_button
     except Exception as e:
-        if DEBUG_MODE:
-            print(f"⚠️ Strategy 2 failed: {e}")
+        log(f"⚠️ Strategy 2 failed: {e}", "debug")
     
-    # Strategy 3: Look for SVG elements that might be the reply icon
+    # Strategy 3: Look for SVG icons inside buttons at the bottom-left of the tweet
     try:
-        # First, find all SVG elements in the tweet
-        svg_elements = await tweet.query_selector_all('svg')
-        
-        if DEBUG_MODE:
-            print(f"🔍 Found {len(svg_elements)} SVG elements in tweet")
-        
-        # Look for SVGs inside a button or clickable div
-        for svg in svg_elements:
-            # Check if this SVG is inside a button or clickable element
-            parent = await svg.evaluate("""function(node) {
-                return node.closest("[role=button]");
-            }""")
-            
-            if parent:
-                # Take a screenshot for debugging
-                if DEBUG_MODE:
-                    await save_screenshot(page, "potential_reply_buttons.png")
+        # One round trip over every SVG instead of a handle and an evaluate per icon
+        marked = await tweet.evaluate("""function(tweet) {
+            const tweetRect = tweet.getBoundingClientRect();
+            for (const svg of tweet.querySelectorAll('svg')) {
+                const button = svg.closest("[role=button]");
+                if (!button) continue;
+                const buttonRect = button.getBoundingClientRect();
                 
-                # Get the parent element in a way we can interact with it
-                parent_element = await tweet.evaluate("""function(tweet, svgElement) {
-                    const svg = svgElement;
-                    const button = svg.closest("[role=button]");
-                    
-                    // Check if this looks like a reply button
-                    const buttonRect = button.getBoundingClientRect();
-                    const tweetRect = tweet.getBoundingClientRect();
-                    
-                    // Reply buttons are typically at the bottom of the tweet
-                    const isNearBottom = (buttonRect.top > tweetRect.top + tweetRect.height * 0.7);
-                    
-                    // Reply is typically the leftmost button
-                    const isLeftSide = (buttonRect.left < tweetRect.left + tweetRect.width * 0.3);
-                    
-                    if (isNearBottom && isLeftSide) {
-                        // Mark this element for identification
-                        button.setAttribute("data-found-reply-button", "true");
-                        return true;
-                    }
-                    return false;
-                }""", svg)
+                // Reply buttons are typically at the bottom of the tweet
+                const isNearBottom = (buttonRect.top > tweetRect.top + tweetRect.height * 0.7);
+                
+                // Reply is typically the leftmost button
+                const isLeftSide = (buttonRect.left < tweetRect.left + tweetRect.width * 0.3);
                 
-                if parent_element:
-                    # Now get the element we marked
-                    reply_button = await tweet.query_selector('[data-found-reply-button="true"]')
-                    if reply_button:
-                        if DEBUG_MODE:
-                            print("✅ Found reply button using SVG position heuristic")
-                        return reply_button
+                if (isNearBottom && isLeftSide) {
+                    // Mark this element for identification
+                    button.setAttribute("data-found-reply-button", "true");
+                    return true;
+                }
+            }
+            return false;
+        }""")
+        
+        if marked:
+            if DEBUG_MODE:
+                await save_screenshot(page, "potential_reply_buttons.png")
+            # Now get the element we marked
+            reply_button = await tweet.query_selector('[data-found-reply-button="true"]')
+            if reply_button:
+                log("✅ Found reply button using SVG position heuristic", "debug")
+                return reply_button
     except Exception as e:
-        if DEBUG_MODE:
-            print(f"⚠️ Strategy 3 failed: {e}")
+        log(f"⚠️ Strategy 3 failed: {e}", "debug")
     
     # Strategy 4: Try to find the first interactive element in the tweet footer
     try:
         # The footer is typically the last section of the tweet
-        footer = await tweet.evaluate("""function(tweet) {
-            // Get all direct children of the tweet
-            const children = Array.from(tweet.children);
+        has_footer = await tweet.evaluate("""function(tweet) {
             // The footer is typically the last child or second-to-last child
-            return children.length >= 2 ? children[children.length - 1] : null;
+            return tweet.children.length >= 2;
         }""")
         
-        if footer:
-            # Find all interactive elements in the footer
-            footer_element = await tweet.query_selector(':scope > :last-child')
-            if footer_element:
-                buttons = await footer_element.query_selector_all('[role="button"]')
-                if buttons and len(buttons) > 0:
-                    # The reply button is typically the first button in the footer
-                    if DEBUG_MODE:
-                        print(f"✅ Found potential reply button as first button in footer (of {len(buttons)} buttons)")
-                    return buttons[0]
+        if has_footer:
+            # The reply button is typically the first button in the footer
+            reply_button = await tweet.query_selector(':scope > :last-child [role="button"]')
+            if reply_button:
+                log("✅ Found potential reply button as first button in footer", "debug")
+                return reply_button
     except Exception as e:
-        if DEBUG_MODE:
-            print(f"⚠️ Strategy 4 failed: {e}")
+        log(f"⚠️ Strategy 4 failed: {e}", "debug")
     
     # If we get here, we couldn't find the reply button
     if DEBUG_MODE:
-        print("❌ Could not find reply button with any strategy")
+        log("❌ Could not find reply button with any strategy", "debug")
         await save_screenshot(page, "reply_button_not_found.png")
     
     return None
 
 # ---------------------- 🔄 MODAL HANDLING ----------------------
-async def wait_for_reply_dialog(page, timeout=DIALOG_DETECTION_TIMEOUT):
+async def wait_for_reply_dialog(page, timeout=None):
     """Wait for the reply dialog to appear using multiple detection methods"""
-    print("⏳ Waiting for reply dialog to appear...")
+    log("⏳ Waiting for reply dialog to appear...")
+    timeout = timeout or latency_tracker.timeout("dialog")
     
     # Use a timeout approach instead of relying on wait_for_selector
     start_time = time.time()
@@ -363,30 +2213,30 @@ async def wait_for_reply_dialog(page, timeout=DIALOG_DETECTION_TIMEOUT):
     while time.time() - start_time < timeout:
         try:
             # Method 1: Check for dialog role
-            dialog = await page.query_selector('div[role="dialog"]')
-            if dialog:
-                print("✅ Found reply dialog using role=dialog")
+            if await page.locator('div[role="dialog"]').count():
+                latency_tracker.observe("dialog", time.time() - start_time)
+                log("✅ Found reply dialog using role=dialog")
                 await save_screenshot(page, "dialog_detected_role.png")
                 return True
             
             # Method 2: Check for specific aria labels
-            post_reply = await page.query_selector('div[aria-label="Post reply"]')
-            if post_reply:
-                print("✅ Found reply dialog using aria-label=Post reply")
+            if await page.locator('div[aria-label="Post reply"]').count():
+                latency_tracker.observe("dialog", time.time() - start_time)
+                log("✅ Found reply dialog using aria-label=Post reply")
                 await save_screenshot(page, "dialog_detected_aria.png")
                 return True
             
             # Method 3: Look for tweet textarea
-            textarea = await page.query_selector('div[data-testid="tweetTextarea_0"], div[role="textbox"]')
-            if textarea:
-                print("✅ Found reply dialog using textarea detection")
+            if await page.locator('div[data-testid="tweetTextarea_0"], div[role="textbox"]').count():
+                latency_tracker.observe("dialog", time.time() - start_time)
+                log("✅ Found reply dialog using textarea detection")
                 await save_screenshot(page, "dialog_detected_textarea.png")
                 return True
             
             # Method 4: Check for reply button in the dialog
-            reply_button = await page.query_selector('div[data-testid="tweetButton"]')
-            if reply_button:
-                print("✅ Found reply dialog using tweet button detection")
+            if await page.locator('div[data-testid="tweetButton"]').count():
+                latency_tracker.observe("dialog", time.time() - start_time)
+                log("✅ Found reply dialog using tweet button detection")
                 await save_screenshot(page, "dialog_detected_button.png")
                 return True
             
@@ -394,10 +2244,11 @@ async def wait_for_reply_dialog(page, timeout=DIALOG_DETECTION_TIMEOUT):
             await asyncio.sleep(0.5)
             
         except Exception as e:
-            print(f"⚠️ Error during dialog detection: {e}")
+            log(f"⚠️ Error during dialog detection: {e}", "warning")
             await asyncio.sleep(0.5)
     
-    print("❌ Reply dialog not detected after timeout")
+    latency_tracker.observe("dialog", timeout, ok=False)
+    log(f"❌ Reply dialog not detected after {timeout:.1f}s", "error")
     await save_screenshot(page, "dialog_detection_failed.png")
     return False
 
@@ -405,18 +2256,15 @@ async def check_for_open_modal(page):
     """Check if a reply modal is currently open using multiple detection methods"""
     try:
         # Method 1: Check for dialog role
-        dialog = await page.query_selector('div[role="dialog"]')
-        if dialog:
+        if await page.locator('div[role="dialog"]').count():
             return True
         
         # Method 2: Check for specific aria labels
-        post_reply = await page.query_selector('div[aria-label="Post reply"]')
-        if post_reply:
+        if await page.locator('div[aria-label="Post reply"]').count():
             return True
         
         # Method 3: Look for tweet textarea
-        textarea = await page.query_selector('div[data-testid="tweetTextarea_0"], div[role="textbox"]')
-        if textarea:
+        if await page.locator('div[data-testid="tweetTextarea_0"], div[role="textbox"]').count():
             # Make sure this textarea is in a dialog context, not just on the main page
             in_dialog = await page.evaluate("""function() {
                 const textarea = document.querySelector('div[data-testid="tweetTextarea_0"], div[role="textbox"]');
@@ -427,8 +2275,7 @@ async def check_for_open_modal(page):
                 return True
         
         # Method 4: Check for reply button in the dialog
-        reply_button = await page.query_selector('div[data-testid="tweetButton"]')
-        if reply_button:
+        if await page.locator('div[data-testid="tweetButton"]').count():
             # Make sure this button is in a dialog context
             in_dialog = await page.evaluate("""function() {
                 const button = document.querySelector('div[data-testid="tweetButton"]');
@@ -446,8 +2293,7 @@ async def check_for_verification_dialog(page):
     """Check if a verification dialog is open (not a reply dialog)"""
     try:
         # Check if there's a dialog open
-        dialog = await page.query_selector('div[role="dialog"]')
-        if not dialog:
+        if not await page.locator('div[role="dialog"]').count():
             return False
         
         # Check if it's a reply dialog
@@ -470,7 +2316,7 @@ async def handle_verification_dialog(page):
         if not await check_for_verification_dialog(page):
             return False
         
-        print("🔍 Verification dialog detected, attempting to handle it...")
+        log("🔍 Verification dialog detected, attempting to handle it...")
         
         # Try to find and click buttons with common verification text
         verification_button_texts = ["Got it", "OK", "Continue", "I understand", "Yes", "Confirm"]
@@ -478,40 +2324,38 @@ async def handle_verification_dialog(page):
         for text in verification_button_texts:
             try:
                 # Try to find a button with this text
-                button = await page.query_selector(f'div[role="button"]:has-text("{text}")')
-                if button:
-                    print(f"✅ Found verification dialog button with text: {text}")
+                button = page.locator(f'div[role="button"]:has-text("{text}")').first
+                if await button.count():
+                    log(f"✅ Found verification dialog button with text: {text}")
                     await button.click()
                     await random_delay(1, 2)
                     
                     # Check if dialog closed
                     if not await check_for_verification_dialog(page):
-                        print("✅ Successfully closed verification dialog")
+                        log("✅ Successfully closed verification dialog")
                         return True
             except Exception:
                 continue
         
         # If no specific button found, try to find any button in the dialog
         try:
-            dialog = await page.query_selector('div[role="dialog"]')
-            if dialog:
-                buttons = await dialog.query_selector_all('div[role="button"]')
-                if buttons and len(buttons) > 0:
-                    # Try clicking the first button
-                    await buttons[0].click()
-                    await random_delay(1, 2)
-                    
-                    # Check if dialog closed
-                    if not await check_for_verification_dialog(page):
-                        print("✅ Successfully closed verification dialog with generic button")
-                        return True
+            button = page.locator('div[role="dialog"] div[role="button"]').first
+            if await button.count():
+                # Try clicking the first button
+                await button.click()
+                await random_delay(1, 2)
+                
+                # Check if dialog closed
+                if not await check_for_verification_dialog(page):
+                    log("✅ Successfully closed verification dialog with generic button")
+                    return True
         except Exception:
             pass
         
-        print("⚠️ Failed to handle verification dialog automatically")
+        log("⚠️ Failed to handle verification dialog automatically", "warning")
         return False
     except Exception as e:
-        print(f"⚠️ Error handling verification dialog: {e}")
+        log(f"⚠️ Error handling verification dialog: {e}", "warning")
         return False
 
 async def close_modal_if_open(page):
@@ -524,20 +2368,20 @@ async def close_modal_if_open(page):
         
         # Then check if it's a reply modal
         if await check_for_open_modal(page):
-            print("⚠️ Found open reply modal, closing it")
+            log("⚠️ Found open reply modal, closing it", "warning")
             await page.keyboard.press("Escape")
             await random_delay(1, 2)
             
             # Check if modal is still open
             if await check_for_open_modal(page):
-                print("⚠️ Failed to close modal with Escape, attempting to reload page")
+                log("⚠️ Failed to close modal with Escape, attempting to reload page", "warning")
                 await page.reload()
                 await wait_for_home_page_loaded(page)
                 await random_delay(3, 5)
                 return True
             return True
     except Exception as e:
-        print(f"⚠️ Error closing modal: {e}")
+        log(f"⚠️ Error closing modal: {e}", "warning")
     
     return False
 
@@ -556,13 +2400,13 @@ async def submit_reply_with_keyboard(page):
         
         # Check if modal is still open
         if not await check_for_open_modal(page):
-            print("✅ Reply submitted successfully with keyboard shortcut")
+            log("✅ Reply submitted successfully with keyboard shortcut")
             return True
         else:
-            print("⚠️ Keyboard shortcut didn't work, modal still open")
+            log("⚠️ Keyboard shortcut didn't work, modal still open", "warning")
             return False
     except Exception as e:
-        print(f"⚠️ Error using keyboard shortcut: {e}")
+        log(f"⚠️ Error using keyboard shortcut: {e}", "warning")
         return False
 
 async def submit_reply_with_button_click(page):
@@ -582,11 +2426,11 @@ async def submit_reply_with_button_click(page):
     
     for selector in post_selectors:
         try:
-            # First check if the selector exists
-            post_button = await page.query_selector(selector)
-            if post_button:
+            # First check if the selector exists (a locator holds no element handle between attempts)
+            post_button = page.locator(selector).first
+            if await post_button.count():
                 if DEBUG_MODE:
-                    print(f"✅ Found post button with selector: {selector}")
+                    log(f"✅ Found post button with selector: {selector}", "debug")
                     await save_screenshot(page, "found_post_button.png")
                 
                 # Try multiple methods to click the button
@@ -600,22 +2444,21 @@ async def submit_reply_with_button_click(page):
                             await post_button.click(force=True)
                         else:
                             # Third try: JavaScript click
-                            await page.evaluate("""function(button) {
+                            await post_button.evaluate("""function(button) {
                                 button.click();
-                            }""", post_button)
+                            }""")
                         
                         # Wait to see if modal closed
                         await random_delay(2, 3)
                         if not await check_for_open_modal(page):
-                            print(f"✅ Reply submitted successfully with {selector} (attempt {attempt+1})")
+                            log(f"✅ Reply submitted successfully with {selector} (attempt {attempt+1})")
                             return True
                         else:
-                            print(f"⚠️ Click attempt {attempt+1} didn't close modal, trying again...")
+                            log(f"⚠️ Click attempt {attempt+1} didn't close modal, trying again...", "warning")
                     except Exception as click_error:
-                        print(f"⚠️ Click attempt {attempt+1} failed: {click_error}")
+                        log(f"⚠️ Click attempt {attempt+1} failed: {click_error}", "warning")
         except Exception:
-            if DEBUG_MODE:
-                print(f"⚠️ Post button selector failed: {selector}")
+            log(f"⚠️ Post button selector failed: {selector}", "debug")
     
     return False
 
@@ -667,22 +2510,22 @@ async def submit_reply_with_direct_dom_manipulation(page):
             # Wait to see if modal closed
             await random_delay(2, 3)
             if not await check_for_open_modal(page):
-                print("✅ Reply submitted successfully with direct DOM manipulation")
+                log("✅ Reply submitted successfully with direct DOM manipulation")
                 return True
             else:
-                print("⚠️ DOM manipulation click didn't close modal")
+                log("⚠️ DOM manipulation click didn't close modal", "warning")
         
         return False
     except Exception as e:
-        print(f"⚠️ Error with direct DOM manipulation: {e}")
+        log(f"⚠️ Error with direct DOM manipulation: {e}", "warning")
         return False
 
 async def submit_reply_with_tab_navigation(page):
     """Try to submit the reply by using tab navigation to focus the submit button"""
     try:
         # First make sure we're in the text area
-        text_area = await page.query_selector('div[role="textbox"]')
-        if text_area:
+        text_area = page.locator('div[role="textbox"]').first
+        if await text_area.count():
             await text_area.focus()
             
             # Tab to the submit button (usually 1-3 tabs away)
@@ -696,13 +2539,13 @@ async def submit_reply_with_tab_navigation(page):
                 
                 # Check if modal closed
                 if not await check_for_open_modal(page):
-                    print(f"✅ Reply submitted successfully with tab navigation (tabs: {i+1})")
+                    log(f"✅ Reply submitted successfully with tab navigation (tabs: {i+1})")
                     return True
             
-            print("⚠️ Tab navigation didn't find the submit button")
+            log("⚠️ Tab navigation didn't find the submit button", "warning")
         return False
     except Exception as e:
-        print(f"⚠️ Error with tab navigation: {e}")
+        log(f"⚠️ Error with tab navigation: {e}", "warning")
         return False
 
 async def try_all_reply_submission_methods(page):
@@ -723,12 +2566,469 @@ async def try_all_reply_submission_methods(page):
     if await submit_reply_with_tab_navigation(page):
         return True
     
-    print("❌ All reply submission methods failed")
+    log("❌ All reply submission methods failed", "error")
     return False
 
+CREATE_TWEET_PATTERN = re.compile(r'/graphql/[^/]+/CreateTweet')
+submission_stats = {"confirmed": 0, "rejected": 0, "no_request": 0, "no_response": 0, "confirm_ms_total": 0}
+
+async def submit_reply_confirmed(page, timeout):
+    """Run the submission methods until X's CreateTweet call answers, and trust only that answer.
+
+    The method cascade is stopped as soon as a CreateTweet request leaves the
+    page, since another click could post twice; success is the response's new
+    tweet id, not a closed modal. Returns a dict with "outcome" (confirmed,
+    rejected, no_request or no_response), "reply_id", "error" and "confirm_ms".
+    """
+    started = time.time()
+    request_sent = asyncio.Event()
+    request_time = {}
+    response_future = asyncio.get_running_loop().create_future()
+
+    def on_request(request):
+        if request.method == "POST" and CREATE_TWEET_PATTERN.search(request.url) and not request_sent.is_set():
+            request_time["sent"] = time.time()
+            request_sent.set()
+
+    async def on_response(response):
+        if response_future.done() or not CREATE_TWEET_PATTERN.search(response.url):
+            return
+        try:
+            body = await response.json()
+        except Exception:
+            body = {}
+        if not response_future.done():
+            response_future.set_result((response.status, body))
+
+    async def cascade():
+        while time.time() - started < timeout:
+            if await try_all_reply_submission_methods(page):
+                return
+            # If we're still here, none of the methods worked
+            # Wait a bit and try again
+            await random_delay(2, 3)
+
+    page.on("request", on_request)
+    page.on("response", on_response)
+    cascade_task = asyncio.create_task(cascade())
+    sent_task = asyncio.create_task(request_sent.wait())
+    try:
+        await asyncio.wait({cascade_task, sent_task}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if not request_sent.is_set() and cascade_task.done():
+            # The DOM says it worked; give the click's request a moment to show up
+            try:
+                await asyncio.wait_for(request_sent.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                pass
+        cascade_task.cancel()
+        if not request_sent.is_set():
+            submission_stats["no_request"] += 1
+            return {"outcome": "no_request", "reply_id": None, "error": "no CreateTweet request was sent"}
+
+        remaining = max(1.0, timeout - (time.time() - started))
+        try:
+            status, body = await asyncio.wait_for(asyncio.shield(response_future), timeout=remaining)
+        except asyncio.TimeoutError:
+            submission_stats["no_response"] += 1
+            return {"outcome": "no_response", "reply_id": None, "error": f"no CreateTweet response within {remaining:.0f}s"}
+    finally:
+        cascade_task.cancel()
+        sent_task.cancel()
+        page.remove_listener("request", on_request)
+        page.remove_listener("response", on_response)
+
+    confirm_ms = round((time.time() - request_time["sent"]) * 1000)
+    result = (((body.get("data") or {}).get("create_tweet") or {}).get("tweet_results") or {}).get("result") or {}
+    reply_id = result.get("rest_id")
+    if status == 200 and reply_id:
+        submission_stats["confirmed"] += 1
+        submission_stats["confirm_ms_total"] += confirm_ms
+        return {"outcome": "confirmed", "reply_id": reply_id, "error": None, "confirm_ms": confirm_ms}
+
+    errors = body.get("errors") or [{}]
+    submission_stats["rejected"] += 1
+    return {"outcome": "rejected", "reply_id": None, "confirm_ms": confirm_ms,
+            "error": f"HTTP {status}: {errors[0].get('message', 'no tweet id in response')}"}
+
+# ---------------------- 💬 REPLY FLOW ----------------------
+async def reply_to_tweet(page, record, scope, reply_stream=None, valuable_reply=None):
+    """Open the reply dialog for a tweet, type the reply and submit it.
+
+    Takes either a finished reply or a ReplyStream that is still arriving; handles
+    created on the way belong to the caller's scope. Returns True once the reply
+    has been posted.
+    """
+    tweet = record["element"]
+    tweet_id = record["id"]
+    try:
+        # Find reply button using our improved function
+        reply_start = time.time()
+        await random_delay(1, 2)  # Add delay before looking for reply button
+        
+        if DEBUG_MODE:
+            log(f"🔍 Analyzing tweet {tweet_id} for reply button", "debug")
+            await save_screenshot(page, f"tweet_{tweet_id}_before_reply.png")
+        
+        reply_button = scope.track(await find_reply_button(tweet, page))
+        
+        if not reply_button:
+            log("⚠️ Reply button not found, skipping...", "warning")
+            return False
+        
+        # Scroll to make sure the button is visible
+        await reply_button.scroll_into_view_if_needed()
+        await random_delay()
+        
+        # Click the reply button
+        try:
+            await reply_button.click()
+        except Exception as click_error:
+            log(f"⚠️ Error clicking reply button: {click_error}", "warning")
+            # Try JavaScript click as fallback
+            try:
+                await page.evaluate("""function(button) {
+                    button.click();
+                }""", reply_button)
+            except Exception:
+                log("⚠️ JavaScript click also failed, skipping...", "warning")
+                return False
+        
+        await random_delay(2, 3)
+        
+        # Check if reply dialog opened using our improved detection
+        if DEBUG_MODE:
+            await save_screenshot(page, f"after_reply_click_{tweet_id}.png")
+        
+        # Wait for the reply dialog to appear using our improved detection
+        dialog_opened = await wait_for_reply_dialog(page)
+        if not dialog_opened:
+            log("⚠️ Reply dialog did not open, skipping...", "warning")
+            return False
+        
+        # Enter reply with human-like typing
+        reply_selectors = [
+            'div[aria-label="Tweet text"]', 
+            'div[data-testid="tweetTextarea_0"]',
+            'div[role="textbox"][aria-label="Tweet text"]',
+            'div[role="textbox"]'
+        ]
+        
+        typing_start = time.time()
+        typing_success = False
+        for selector in reply_selectors:
+            try:
+                if await page.locator(selector).count():
+                    log(f"✅ Found reply box with selector: {selector}", "debug")
+                    
+                    if reply_stream:
+                        # The stream can only be consumed once, so no fallback selectors
+                        valuable_reply = await type_streamed_reply(page, selector, reply_stream)
+                        typing_success = valuable_reply is not None
+                        break
+                    if await human_like_typing(page, selector, valuable_reply):
+                        typing_success = True
+                        break
+            except Exception:
+                log(f"⚠️ Selector failed: {selector}", "debug")
+        
+        if not typing_success:
+            log("⚠️ Reply box not found or typing failed, closing modal...", "warning")
+            await close_modal_if_open(page)
+            return False
+        # Kept so a failed post can be retried after a restart without generating again
+        record["reply"] = valuable_reply
+        
+        await random_delay(1, 2)
+        
+        # Submit, and wait for X to confirm the new reply
+        submission_start_time = time.time()
+        submission = await submit_reply_confirmed(page, latency_tracker.timeout("submission"))
+        submission_success = submission["outcome"] == "confirmed"
+        latency_tracker.observe("submission", time.time() - submission_start_time, ok=submission_success)
+        
+        if submission_success:
+            record["reply_id"] = submission["reply_id"]
+            log(f"✅ Reply {submission['reply_id']} confirmed in {submission['confirm_ms']}ms")
+            event_log.emit("reply_submitted", tweet_id=tweet_id, reply_id=submission["reply_id"],
+                           typing_ms=round((submission_start_time - typing_start) * 1000),
+                           submit_ms=round((time.time() - submission_start_time) * 1000),
+                           confirm_ms=submission["confirm_ms"],
+                           total_ms=round((time.time() - reply_start) * 1000))
+            analytics.record("posted")
+            analytics.record_latency("reply", time.time() - reply_start)
+            # Wait longer after posting to avoid rate limiting
+            await random_delay(4, 7)
+            return True
+
+        log_error("submission", submission["error"], tweet_id=tweet_id, outcome=submission["outcome"])
+        if submission["outcome"] == "no_response":
+            # It may have been posted after all; never retry it after a restart
+            record["reply"] = None
+        # Close the modal and continue
+        await close_modal_if_open(page)
+        return False
+        
+    except Exception as e:
+        log_error("reply", e, tweet_id=tweet_id)
+        # Try to close any open dialogs
+        await close_modal_if_open(page)
+        return False
+    finally:
+        # Skipped before typing: don't keep paying for tokens nobody will use
+        if reply_stream:
+            reply_stream.cancel()
+
+async def locate_candidate(page, record, scope):
+    """Open the candidate's permalink on the actor page and find its article there.
+
+    The scanner's handle for it belongs to another page, so it is never used here.
+    Returns False if the tweet can't be reached.
+    """
+    record["element"] = None
+    if not record["id"]:
+        return False
+    selector = f'article[data-testid="tweet"]:has(a[href$="/status/{record["id"]}"])'
+    log(f"🔗 Opening permalink for queued tweet {record['id']}", "debug")
+    try:
+        await page.goto(record["url"] or f"https://x.com/i/status/{record['id']}", wait_until="domcontentloaded")
+        record["element"] = scope.track(await page.wait_for_selector(selector, timeout=15000))
+        return True
+    except Exception as e:
+        log_error("locate", e, tweet_id=record["id"])
+        return False
+
+async def reply_to_candidate(page, record, reply_stream=None, valuable_reply=None):
+    """Locate a queued candidate on the actor page and reply to it"""
+    scope = HandleScope("reply")
+    try:
+        if not await locate_candidate(page, record, scope):
+            log("⚠️ Queued tweet is no longer reachable, skipping...", "warning")
+            if reply_stream:
+                reply_stream.cancel()
+            return False
+        return await reply_to_tweet(page, record, scope, reply_stream=reply_stream, valuable_reply=valuable_reply)
+    finally:
+        await scope.dispose()
+        record["element"] = None
+
+async def process_candidate(page, record):
+    """Gate, generate and (when posting is enabled) reply to one selected candidate.
+
+    Returns True if a reply was posted.
+    """
+    tweet_id = record["id"]
+
+    # Generated before a restart but never posted: reuse the text
+    if record.get("reply"):
+        log("♻️ Posting reply generated before the restart...")
+        record["attempted_at"] = time.time()
+        return await retry_later_if_unposted(record, await reply_to_candidate(page, record, valuable_reply=record["reply"]))
+
+    # Don't queue generation work while the LLM upstream is known to be down
+    if not llm_breaker.accepting():
+        log("🔌 LLM upstream unavailable (circuit open), skipping...")
+        return False
+
+    # Cheap relevance gate before spending a premium-model call
+    if not await passes_relevance_gate(record["text"], tweet_id):
+        log("🚦 Not worth a reply, skipping...")
+        return False
+
+    log(f"✅ Verified account, score {record['score']:.2f} - generating reply...")
+    # From here on the attempt costs a generation and touches X, so it counts against the pacing
+    record["attempted_at"] = time.time()
+
+    # Generate reply; when streaming, tokens keep arriving while the dialog opens
+    streamed = STREAM_REPLIES and POST_REPLIES
+    if streamed:
+        reply_stream = await start_reply_stream(record["text"], tweet_id)
+        if reply_stream is None:
+            return False
+        posted = await reply_to_candidate(page, record, reply_stream=reply_stream)
+        if posted or not reply_stream.rejected:
+            return await retry_later_if_unposted(record, posted)
+        # The stream had a single shot; pick from several candidates instead
+        reply_validator.stats["reprompts"] += 1
+        log("🔁 Regenerating the rejected streamed reply without streaming...")
+
+    # A fallback after a rejected stream already waited for its throttle slot
+    valuable_reply = await generate_valuable_reply(record["text"], tweet_id, throttled=not streamed)
+    if not valuable_reply or not POST_REPLIES:
+        return False
+    return await retry_later_if_unposted(record, await reply_to_candidate(page, record, valuable_reply=valuable_reply))
+
+async def retry_later_if_unposted(record, posted, max_attempts=2):
+    """Hand generated-but-unposted replies to the checkpoint so the next run can post them"""
+    if not posted and record.get("reply"):
+        record["attempts"] = record.get("attempts", 0) + 1
+        if record["attempts"] < max_attempts:
+            checkpoint.unposted.append(record)
+    return posted
+
+# ---------------------- 🎭 REPLY ACTOR ----------------------
+class ReplyActor:
+    """Replies to queued candidates on a page of its own.
+
+    The scan loop only extracts, scores and queues candidates on the scanner
+    page. This task awaits the best candidate the queue's pacing allows, then
+    gates, generates and replies on the actor page, reached by permalink. Scan
+    throughput no longer depends on reply latency, and reply dialogs never open
+    on the page being scanned.
+    """
+
+    def __init__(self):
+        self.current = None
+        self.stats = {"attempted": 0, "posted": 0, "errors": 0, "busy_total": 0.0}
+
+    async def run(self, session, replied_tweets, on_posted):
+        """Reply until cancelled or asked to stop; on_posted(record) is called after each post"""
+        while True:
+            try:
+                if not await self.next_candidate(session, replied_tweets, on_posted):
+                    return
+            except Exception as e:
+                # Never let one failure stop replies for the rest of the run while scanning carries on
+                self.current = None
+                self.stats["errors"] += 1
+                log_error("actor", e)
+                await asyncio.sleep(5)
+
+    async def next_candidate(self, session, replied_tweets, on_posted):
+        """Wait for and handle one candidate; returns False once a stop has been requested"""
+        record = await candidate_queue.get()
+        if not should_continue():
+            # Picked up by the next run through the checkpoint
+            checkpoint.unposted.append(record)
+            return False
+        if record["text"] in replied_tweets:
+            return True
+
+        self.current = record
+        watchdog.progress("actor")
+        started = time.time()
+        try:
+            posted = await process_candidate(session.actor_page, record)
+            near_duplicates.remember(record["fingerprint"], record["id"], "replied" if posted else "not_replied")
+            if posted:
+                self.stats["posted"] += 1
+                on_posted(record)
+        except Exception as e:
+            log_error("tweet", e, tweet_id=record["id"])
+        finally:
+            # Failed attempts pace too, so a rate-limited X isn't hit again straight away
+            if record.get("attempted_at", 0) >= started:
+                candidate_queue.record_dispatch()
+            self.current = None
+            self.stats["attempted"] += 1
+            self.stats["busy_total"] += time.time() - started
+            watchdog.progress("actor")
+        return True
+
+    async def wait_idle(self):
+        """Let an in-flight reply finish"""
+        if self.current is not None:
+            log(f"⏳ Waiting for the reply to {self.current['id']} to finish...")
+        while self.current is not None:
+            await asyncio.sleep(0.5)
+
+    def snapshot(self):
+        attempted = self.stats["attempted"]
+        return {
+            "attempted": attempted,
+            "posted": self.stats["posted"],
+            "errors": self.stats["errors"],
+            "avg_reply_s": round(self.stats["busy_total"] / attempted, 1) if attempted else None,
+            "busy_with": self.current["id"] if self.current else None
+        }
+
+reply_actor = ReplyActor()
+
+# ---------------------- 🧪 DRY-RUN OUTPUT ----------------------
+DRY_RUN_FIELDS = ["tweet_id", "url", "author", "text", "keywords", "score", "gate", "reply",
+                  "model", "prompt_tokens", "completion_tokens", "cost_usd", "latency_ms", "ts"]
+
+class DryRunWriter:
+    """Appends one row per evaluated candidate to a JSONL or CSV file.
+
+    Used when post_replies is off: nothing touches the reply UI, and every
+    generated reply is kept for review instead of being thrown away.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.format = "csv" if path.endswith(".csv") else "jsonl"
+        self._file = None
+        self._lock = threading.Lock()
+        self.stats = {"written": 0, "generated": 0, "rejected": 0, "failed": 0}
+
+    def _write(self, row):
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+                self._file = open(self.path, "a", encoding="utf-8", newline="")
+                if self.format == "csv" and is_new:
+                    csv.writer(self._file).writerow(DRY_RUN_FIELDS)
+            if self.format == "csv":
+                values = dict(row, keywords=";".join(row["keywords"]))
+                csv.writer(self._file).writerow([values.get(field, "") for field in DRY_RUN_FIELDS])
+            else:
+                self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self.stats["written"] += 1
+
+    async def write(self, row):
+        await asyncio.to_thread(self._write, row)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def snapshot(self):
+        return dict(self.stats, output=self.path, in_flight=len(dry_run_tasks))
+
+dry_run_writer = DryRunWriter(DRY_RUN_OUTPUT)
+dry_run_slots = asyncio.Semaphore(DRY_RUN_CONCURRENCY)
+dry_run_tasks = set()
+
+async def dry_run_candidate(record):
+    """Gate and generate a reply for one candidate and write the result, without any UI or pacing"""
+    async with dry_run_slots:
+        row = {
+            "tweet_id": record["id"], "url": record["url"], "author": record["author"],
+            "text": record["text"], "keywords": record.get("keywords", []), "score": record.get("score"),
+            "gate": "passed", "reply": None, "ts": time.time()
+        }
+        try:
+            if not llm_breaker.accepting():
+                row["gate"] = "llm_unavailable"
+            elif not await passes_relevance_gate(record["text"], record["id"]):
+                row["gate"] = "rejected"
+                dry_run_writer.stats["rejected"] += 1
+            else:
+                details = {}
+                row["reply"] = await generate_valuable_reply(record["text"], record["id"], details=details)
+                row.update(details)
+                dry_run_writer.stats["generated" if row["reply"] else "failed"] += 1
+            await dry_run_writer.write(row)
+        except Exception as e:
+            dry_run_writer.stats["failed"] += 1
+            log_error("dry_run", e, tweet_id=record["id"])
+
+async def dispatch_dry_run(record):
+    """Start a dry-run generation, waiting first if too many are already in flight"""
+    while len(dry_run_tasks) >= DRY_RUN_CONCURRENCY * 4:
+        await asyncio.wait(dry_run_tasks, return_when=asyncio.FIRST_COMPLETED)
+    task = asyncio.create_task(dry_run_candidate(record))
+    dry_run_tasks.add(task)
+    task.add_done_callback(dry_run_tasks.discard)
+
 # ---------------------- 🔄 CONTROL VARIABLES ----------------------
 import signal
-import sys
 
 # Global control variables for external control
 automation_should_stop = False
@@ -737,7 +3037,7 @@ automation_stats_file = "automation_stats.json"
 def signal_handler(signum, frame):
     """Handle stop signals"""
     global automation_should_stop
-    print("\n🛑 Stop signal received. Gracefully shutting down...")
+    log("🛑 Stop signal received. Gracefully shutting down...")
     automation_should_stop = True
 
 # Register signal handler only if in main thread
@@ -746,7 +3046,7 @@ try:
     signal.signal(signal.SIGTERM, signal_handler)
 except ValueError:
     # Not in main thread, skip signal handler registration
-    print("⚠️ Signal handlers not available in this thread context")
+    log("⚠️ Signal handlers not available in this thread context", "warning")
 
 def update_stats(tweets_processed=0, replies_sent=0, status="Running"):
     """Update automation statistics"""
@@ -755,78 +3055,880 @@ def update_stats(tweets_processed=0, replies_sent=0, status="Running"):
             "tweets_processed": tweets_processed,
             "replies_sent": replies_sent,
             "status": status,
-            "last_update": time.time()
+            "last_update": time.time(),
+            "generation": usage_tracker.snapshot(),
+            "governor": generation_governor.snapshot(),
+            "gate": gate_snapshot(),
+            "llm_health": llm_health_snapshot(),
+            "reply_validation": reply_validator.snapshot(),
+            "scoring": scoring_stats,
+            "queue": candidate_queue.snapshot(),
+            "near_duplicates": near_duplicates.snapshot(),
+            "scrolling": scroll_snapshot(),
+            "idle": idle_backoff.snapshot(),
+            "handles": handle_stats,
+            "ingestion": timeline_ingestor.snapshot(),
+            "session": session_metrics,
+            "checkpoint": checkpoint.snapshot(),
+            "dry_run": dry_run_writer.snapshot() if not POST_REPLIES else None,
+            "timeouts": latency_tracker.snapshot(),
+            "submission": submission_stats,
+            "auth": auth_state,
+            "watchdog": watchdog.snapshot(),
+            "actor": reply_actor.snapshot()
         }
-        with open(automation_stats_file, "w") as f:
+        # Write-then-rename so the dashboard never reads a half-written file
+        with open(automation_stats_file + ".tmp", "w") as f:
             json.dump(stats, f)
+        os.replace(automation_stats_file + ".tmp", automation_stats_file)
     except Exception as e:
-        print(f"⚠️ Error updating stats: {e}")
+        log(f"⚠️ Error updating stats: {e}", "warning")
 
 def should_continue():
     """Check if automation should continue running"""
     return not automation_should_stop
 
+# ---------------------- 🔒 WORKER LOCK & HEARTBEAT ----------------------
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows; the dashboard falls back to a PID check there
+    fcntl = None
+
+automation_lock_file = "automation.lock"
+
+worker_lock_handle = None
+worker_start_time = None
+last_progress_time = None
+
+def acquire_worker_lock(retry_for=0.5):
+    """Take the exclusive worker lock and record our PID and start time in it"""
+    global worker_lock_handle, worker_start_time, last_progress_time
+    fd = os.open(automation_lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+    handle = os.fdopen(fd, "r+")
+    if fcntl is not None:
+        # The dashboard holds a shared lock for a moment while it reads the heartbeat; only a worker holds it longer
+        deadline = time.time() + retry_for
+        while True:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError:
+                if time.time() >= deadline:
+                    handle.close()
+                    return False
+                time.sleep(0.05)
+
+    worker_lock_handle = handle
+    worker_start_time = time.time()
+    last_progress_time = worker_start_time
+    write_heartbeat()
+    return True
+
+def write_heartbeat():
+    """Rewrite the lock file in place with a fresh heartbeat timestamp"""
+    if worker_lock_handle is None:
+        return
+    try:
+        payload = {
+            "pid": os.getpid(),
+            "start_time": worker_start_time,
+            "heartbeat": time.time(),
+            "heartbeat_interval": HEARTBEAT_INTERVAL,
+            "last_progress": last_progress_time
+        }
+        worker_lock_handle.seek(0)
+        worker_lock_handle.truncate()
+        worker_lock_handle.write(json.dumps(payload))
+        worker_lock_handle.flush()
+    except Exception as e:
+        log(f"⚠️ Error writing heartbeat: {e}", "warning")
+
+def mark_progress():
+    """Record that the worker made forward progress (tweet read, reply sent, scroll done)"""
+    global last_progress_time
+    last_progress_time = time.time()
+
+async def heartbeat_loop():
+    """Refresh the heartbeat at a fixed interval for as long as the event loop is responsive"""
+    while True:
+        write_heartbeat()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+def release_worker_lock():
+    """Remove the lock file and release the lock"""
+    global worker_lock_handle
+    if worker_lock_handle is None:
+        return
+    try:
+        # Unlink while still holding the lock so nobody can grab a file that is about to vanish
+        os.remove(automation_lock_file)
+    except OSError:
+        pass
+    try:
+        if fcntl is not None:
+            fcntl.flock(worker_lock_handle.fileno(), fcntl.LOCK_UN)
+        worker_lock_handle.close()
+    except Exception:
+        pass
+    worker_lock_handle = None
+
+# ---------------------- 📈 ANALYTICS STORE ----------------------
+# Upper bounds (ms) of the latency histogram bins; one extra bin catches everything slower
+LATENCY_BINS_MS = [100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000]
+METRIC_COUNTERS = ["scanned", "matched", "generated", "posted",
+                   "llm_calls", "llm_errors", "prompt_tokens", "completion_tokens", "cost_usd"]
+LATENCY_STAGES = ["generation", "reply"]
+# (table suffix, bucket width in seconds, retention in seconds or None to keep forever)
+ROLLUP_LEVELS = [("minute", 60, 3 * 86400), ("hour", 3600, 120 * 86400), ("day", 86400, None)]
+
+def latency_percentile(hist, q):
+    """Approximate a percentile (ms) from a latency histogram"""
+    total = sum(hist)
+    if not total:
+        return None
+    target = q * total
+    running = 0
+    for i, count in enumerate(hist):
+        running += count
+        if running >= target:
+            return LATENCY_BINS_MS[i] if i < len(LATENCY_BINS_MS) else LATENCY_BINS_MS[-1] * 2
+    return LATENCY_BINS_MS[-1] * 2
+
+class AnalyticsStore:
+    """Time-series metrics in SQLite: per-minute buckets rolled up into hour and day tables.
+
+    The worker only touches in-memory counters; `take_pending()` hands the deltas
+    accumulated since the last flush to `write()`, which runs off the event loop
+    and adds them into every rollup level, so hour/day rows are never rebuilt from
+    raw data.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pending = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            for level, _, _ in ROLLUP_LEVELS:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS metrics_{level} (bucket INTEGER PRIMARY KEY)")
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info(metrics_{level})")}
+                for column, ddl in self._columns():
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE metrics_{level} ADD COLUMN {column} {ddl}")
+
+    @staticmethod
+    def _columns():
+        columns = [(name, "REAL NOT NULL DEFAULT 0") for name in METRIC_COUNTERS]
+        for stage in LATENCY_STAGES:
+            columns += [(f"{stage}_hist", "TEXT"), (f"{stage}_p50", "REAL"), (f"{stage}_p95", "REAL")]
+        return columns
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _current(self):
+        minute = int(time.time() // 60 * 60)
+        entry = self._pending.get(minute)
+        if entry is None:
+            entry = {
+                "counts": dict.fromkeys(METRIC_COUNTERS, 0),
+                "hists": {stage: [0] * (len(LATENCY_BINS_MS) + 1) for stage in LATENCY_STAGES}
+            }
+            self._pending[minute] = entry
+        return entry
+
+    def record(self, counter, amount=1):
+        """Add to a counter in the current minute"""
+        self._current()["counts"][counter] += amount
+
+    def record_latency(self, stage, seconds):
+        """Add one latency observation for a stage to the current minute"""
+        ms = seconds * 1000
+        hist = self._current()["hists"][stage]
+        for i, bound in enumerate(LATENCY_BINS_MS):
+            if ms <= bound:
+                hist[i] += 1
+                break
+        else:
+            hist[-1] += 1
+
+    def take_pending(self):
+        """Detach everything recorded since the last flush"""
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def write(self, pending):
+        """Merge detached deltas into every rollup level (safe to run in a worker thread)"""
+        if not pending:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            for level, width, retention in ROLLUP_LEVELS:
+                merged = {}
+                for minute, entry in pending.items():
+                    bucket = minute - minute % width
+                    target = merged.setdefault(bucket, {
+                        "counts": dict.fromkeys(METRIC_COUNTERS, 0),
+                        "hists": {stage: [0] * (len(LATENCY_BINS_MS) + 1) for stage in LATENCY_STAGES}
+                    })
+                    for name, value in entry["counts"].items():
+                        target["counts"][name] += value
+                    for stage, hist in entry["hists"].items():
+                        target["hists"][stage] = [a + b for a, b in zip(target["hists"][stage], hist)]
+
+                for bucket, delta in merged.items():
+                    self._merge_row(conn, level, bucket, delta)
+
+                if retention:
+                    conn.execute(f"DELETE FROM metrics_{level} WHERE bucket < ?", (now - retention,))
+
+    def read_totals(self, level, bucket):
+        """Counter totals stored for one rollup bucket (e.g. today's day row)"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(f"SELECT * FROM metrics_{level} WHERE bucket = ?", (bucket,)).fetchone()
+        return {name: row[name] for name in METRIC_COUNTERS} if row else {}
+
+    def _merge_row(self, conn, level, bucket, delta):
+        hist_columns = ", ".join(f"{stage}_hist" for stage in LATENCY_STAGES)
+        row = conn.execute(f"SELECT {hist_columns} FROM metrics_{level} WHERE bucket = ?", (bucket,)).fetchone()
+
+        values = {"bucket": bucket}
+        for stage, stored in zip(LATENCY_STAGES, row or [None] * len(LATENCY_STAGES)):
+            hist = delta["hists"][stage]
+            if stored:
+                hist = [a + b for a, b in zip(json.loads(stored), hist)]
+            values[f"{stage}_hist"] = json.dumps(hist)
+            values[f"{stage}_p50"] = latency_percentile(hist, 0.5)
+            values[f"{stage}_p95"] = latency_percentile(hist, 0.95)
+        values.update(delta["counts"])
+
+        columns = ", ".join(values)
+        placeholders = ", ".join(f":{name}" for name in values)
+        updates = ", ".join(
+            [f"{name} = {name} + excluded.{name}" for name in delta["counts"]] +
+            [f"{name} = excluded.{name}" for name in values if name != "bucket" and name not in delta["counts"]]
+        )
+        conn.execute(
+            f"INSERT INTO metrics_{level} ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT(bucket) DO UPDATE SET {updates}",
+            values
+        )
+
+analytics = AnalyticsStore(config.get("analytics_db", "data/automation_metrics.db"))
+
+async def flush_analytics():
+    """Write pending metric deltas to SQLite without blocking the event loop"""
+    try:
+        await asyncio.to_thread(analytics.write, analytics.take_pending())
+    except Exception as e:
+        log_error("analytics", e)
+
+async def analytics_flush_loop(interval=30):
+    """Periodically persist metrics so the dashboard history stays current"""
+    while True:
+        await asyncio.sleep(interval)
+        await flush_analytics()
+
+# ---------------------- 💾 CHECKPOINT & RESUME ----------------------
+class Checkpoint:
+    """Periodic snapshot of scan progress so a restarted worker carries on where the last one stopped.
+
+    Holds cumulative counters, recently processed tweet ids (to skip known content
+    quickly), recent replied texts, and candidates that were queued or generated
+    but not posted yet. Written atomically as JSON.
+    """
+
+    def __init__(self, path, interval=60, max_ids=5000, max_replied=500):
+        self.path = path
+        self.interval = interval
+        self.max_ids = max_ids
+        self.max_replied = max_replied
+        self.processed_ids = OrderedDict()
+        self.unposted = []
+        self.last_tweet_id = None
+        self.last_tweet_time = None
+        self.last_save = 0.0
+        self.restored = {}
+
+    def load(self):
+        """Read the previous run's checkpoint; returns it, or None if there is none"""
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log_error("checkpoint", e, path=self.path)
+            return None
+        self.processed_ids = OrderedDict.fromkeys(state.get("processed_ids", []))
+        self.last_tweet_id = state.get("last_tweet_id")
+        self.last_tweet_time = state.get("last_tweet_time")
+        self.restored = {"saved_at": state.get("saved_at"), "pending": len(state.get("pending", []))}
+        return state
+
+    def is_known(self, tweet_id):
+        return tweet_id in self.processed_ids
+
+    def mark_processed(self, tweet_id):
+        if not tweet_id:
+            return
+        self.processed_ids[tweet_id] = None
+        self.processed_ids.move_to_end(tweet_id)
+        while len(self.processed_ids) > self.max_ids:
+            self.processed_ids.popitem(last=False)
+        self.last_tweet_id = tweet_id
+        self.last_tweet_time = time.time()
+
+    def due(self):
+        return time.time() - self.last_save >= self.interval
+
+    async def save(self, tweets_processed, replies_sent, replied_tweets):
+        """Write the checkpoint off the event loop"""
+        # Unposted records never go back into the queue, so nothing is listed twice
+        pending = self.unposted + candidate_queue.pending()
+        state = {
+            "saved_at": time.time(),
+            "last_tweet_id": self.last_tweet_id,
+            "last_tweet_time": self.last_tweet_time,
+            "tweets_processed": tweets_processed,
+            "replies_sent": replies_sent,
+            "processed_ids": list(self.processed_ids),
+            "replied_tweets": list(replied_tweets)[-self.max_replied:],
+            "pending": [{k: v for k, v in record.items() if k != "element"} for record in pending]
+        }
+        self.last_save = state["saved_at"]
+        try:
+            await asyncio.to_thread(self._write, state)
+        except Exception as e:
+            log_error("checkpoint", e, path=self.path)
+
+    def _write(self, state):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.path)
+
+    def snapshot(self):
+        return {
+            "last_save": self.last_save or None,
+            "known_ids": len(self.processed_ids),
+            "unposted": len(self.unposted),
+            "resumed_from": self.restored.get("saved_at"),
+            "restored_pending": self.restored.get("pending", 0)
+        }
+
+checkpoint = Checkpoint(CHECKPOINT_FILE, CHECKPOINT_INTERVAL)
+
+# ---------------------- 🍪 BROWSER SESSION ----------------------
+BROWSER_ARGS = [
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--no-first-run",
+    "--disable-extensions",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding"
+]
+
+# Startup cost and snapshot state of the running session, reported in the stats file
+session_metrics = {}
+
+def path_size(path):
+    """Total bytes of a file or directory tree (0 if missing)"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+class BrowserSession:
+    """The browser context the worker runs in.
+
+    "profile" mode launches a persistent Chromium profile from USER_DATA_DIR.
+    "snapshot" mode launches a throwaway context seeded from a storage_state
+    file (cookies and local storage only), which is far smaller and quicker to
+    load and can be copied to a fresh container. Both modes export a snapshot
+    after login and refresh it periodically, and measure their startup cost.
+    """
+
+    def __init__(self, playwright, mode=SESSION_MODE, snapshot_path=SESSION_SNAPSHOT):
+        self.playwright = playwright
+        self.mode = mode
+        self.snapshot_path = snapshot_path
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.actor_page = None
+        self.started = None
+        self.metrics = session_metrics
+        self.metrics.update(mode=mode)
+
+    async def start(self):
+        self.started = time.time()
+        if self.mode == "snapshot":
+            self.browser = await self.playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+            has_snapshot = os.path.exists(self.snapshot_path)
+            if has_snapshot:
+                log(f"🍪 Using session snapshot from: {self.snapshot_path}")
+            else:
+                log(f"⚠️ No session snapshot at {self.snapshot_path}; starting logged out", "warning")
+            self.context = await self.browser.new_context(storage_state=self.snapshot_path if has_snapshot else None)
+            self.metrics["state_bytes"] = path_size(self.snapshot_path)
+        else:
+            log(f"📂 Using persistent session from: {USER_DATA_DIR}")
+            self.context = await self.playwright.chromium.launch_persistent_context(
+                user_data_dir=USER_DATA_DIR,
+                headless=True,  # Must be True in containers
+                args=BROWSER_ARGS
+            )
+            self.metrics["state_bytes"] = await asyncio.to_thread(path_size, USER_DATA_DIR)
+
+        # Use the first page in the browser
+        self.page = self.context.pages[0] if self.context.pages else await self.context.new_page()
+        self.metrics["launch_ms"] = round((time.time() - self.started) * 1000)
+        return self.page
+
+    def home_ready(self):
+        """Record time-to-home once the timeline has loaded"""
+        self.metrics["time_to_home_ms"] = round((time.time() - self.started) * 1000)
+        log(f"⏱️ Session ready: {self.mode} mode, launch {self.metrics['launch_ms']}ms, "
+            f"home after {self.metrics['time_to_home_ms']}ms, {self.metrics['state_bytes'] / 1e6:.1f} MB of state")
+        event_log.emit("session_started", **self.metrics)
+
+    async def save_snapshot(self):
+        """Export cookies and local storage so a fresh context can start logged in"""
+        try:
+            directory = os.path.dirname(self.snapshot_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = self.snapshot_path + ".tmp"
+            await self.context.storage_state(path=temp_path)
+            # It holds auth cookies: keep it private, and never leave a half-written file behind
+            os.chmod(temp_path, 0o600)
+            os.replace(temp_path, self.snapshot_path)
+            self.metrics["snapshot_bytes"] = os.path.getsize(self.snapshot_path)
+            self.metrics["snapshot_saved"] = time.time()
+            log(f"🍪 Session snapshot saved to {self.snapshot_path}", "debug")
+        except Exception as e:
+            log_error("snapshot", e)
+
+    async def open_actor_page(self):
+        """Second page in the same context where replies are made, apart from the scanned timeline.
+
+        Replaces (and closes) the current actor page if there is one.
+        """
+        old_page, self.actor_page = self.actor_page, await self.context.new_page()
+        self.actor_page.set_default_timeout(30000)
+        if old_page is not None:
+            try:
+                await old_page.close()
+            except Exception:
+                pass
+        return self.actor_page
+
+    async def new_page(self):
+        """Swap the scanner page for a fresh one in the same context"""
+        old_page, self.page = self.page, await self.context.new_page()
+        try:
+            await old_page.close()
+        except Exception:
+            pass
+        return self.page
+
+    async def restart(self):
+        """Close and relaunch the whole context, keeping the session through a snapshot"""
+        await self.save_snapshot()
+        try:
+            await self.close()
+        except Exception as e:
+            log_error("session_close", e)
+        had_actor = self.actor_page is not None
+        self.browser = self.context = self.page = self.actor_page = None
+        page = await self.start()
+        if had_actor:
+            await self.open_actor_page()
+        return page
+
+    async def close(self):
+        if self.context:
+            await self.context.close()
+        if self.browser:
+            await self.browser.close()
+
+def prepare_page(page):
+    """Per-page setup: default timeout and the timeline response listeners"""
+    page.set_default_timeout(30000)
+    timeline_watcher.attach(page)
+    timeline_ingestor.attach(page)
+
+async def snapshot_refresh_loop(session, interval=SNAPSHOT_REFRESH_INTERVAL):
+    """Keep the session snapshot current as X rotates its cookies"""
+    while True:
+        await asyncio.sleep(interval)
+        await session.save_snapshot()
+
+# ---------------------- 🐕 STALL WATCHDOG ----------------------
+WATCHDOG_STEPS = {
+    "scanner": ["close_dialogs", "reload_page", "new_page", "relaunch_context"],
+    # The actor shares the scanner's context; a fresh page also fails whatever reply was stuck on the old one
+    "actor": ["close_dialogs", "new_page"]
+}
+
+class StallWatchdog:
+    """Escalating recovery for a page that has stopped making forward progress.
+
+    Two pages are watched. The scanner's progress is whatever calls
+    mark_progress() (tweets seen, replies posted, scrolls and idle waits); the
+    actor reports progress() when it starts and finishes a candidate, and only
+    counts as stalled while it is busy with one. After stall_window seconds
+    without progress the watchdog closes dialogs on that page; every further
+    window escalates one step: for the scanner reload the page, open a new page,
+    relaunch the context; for the actor open a new page. A ladder starts over
+    once its page makes progress again. Each action is bounded by action_timeout
+    so a wedged browser cannot hang the watchdog too.
+    """
+
+    def __init__(self, settings):
+        self.stall_window = settings.get("stall_window", 180)
+        self.check_interval = settings.get("check_interval", 10)
+        self.action_timeout = settings.get("action_timeout", 60)
+        self.targets = {target: {"level": 0, "last_action": 0.0, "progress": 0.0} for target in WATCHDOG_STEPS}
+        self.stats = {
+            "stall_window": self.stall_window,
+            "level": {target: 0 for target in WATCHDOG_STEPS},
+            "escalations": {target: {step: 0 for step in steps} for target, steps in WATCHDOG_STEPS.items()},
+            "failed": 0,
+            "recoveries": 0,
+            "last_escalation": None
+        }
+
+    def progress(self, target):
+        """Record forward progress on a page other than the scanner's"""
+        self.targets[target]["progress"] = time.time()
+
+    def last_progress(self, target):
+        if target == "scanner":
+            return last_progress_time or 0.0
+        return self.targets[target]["progress"]
+
+    def stalled_for(self, target, now=None):
+        """Seconds since the target's last progress or last escalation, whichever is later"""
+        if target == "actor" and reply_actor.current is None:
+            # Waiting for a candidate is not a stall
+            return 0.0
+        now = now or time.time()
+        return now - max(self.last_progress(target) or now, self.targets[target]["last_action"])
+
+    async def escalate(self, session, target):
+        """Run the target's next recovery step; returns True if it completed"""
+        state = self.targets[target]
+        steps = WATCHDOG_STEPS[target]
+        step = steps[min(state["level"], len(steps) - 1)]
+        stalled = round(time.time() - (self.last_progress(target) or time.time()))
+        log(f"🐕 No progress on the {target} page for {stalled}s, watchdog step: {step}", "warning")
+        started = time.time()
+        try:
+            await asyncio.wait_for(self.run_step(session, target, step), self.action_timeout)
+            ok = True
+        except Exception as e:
+            log_error("watchdog", e, target=target, step=step)
+            ok = False
+
+        state["level"] += 1
+        state["last_action"] = time.time()
+        self.stats["level"][target] = state["level"]
+        self.stats["escalations"][target][step] += 1
+        self.stats["failed"] += not ok
+        self.stats["last_escalation"] = {"target": target, "step": step, "at": state["last_action"],
+                                         "stalled_s": stalled, "ok": ok,
+                                         "duration_ms": round((state["last_action"] - started) * 1000)}
+        event_log.emit("watchdog_escalation", "warning", target=target, step=step, stalled_s=stalled, ok=ok)
+        return ok
+
+    async def run_step(self, session, target, step):
+        page = session.page if target == "scanner" else session.actor_page
+        if step == "close_dialogs":
+            await page.keyboard.press("Escape")
+            await close_modal_if_open(page)
+            return
+        if target == "actor":
+            # The reply in flight fails with the old page and the actor moves on
+            await session.open_actor_page()
+            return
+        if step == "reload_page":
+            await page.reload(wait_until="domcontentloaded")
+        else:
+            page = await session.new_page() if step == "new_page" else await session.restart()
+            prepare_page(page)
+            await page.goto("https://x.com/home", wait_until="domcontentloaded")
+        await wait_for_home_page_loaded(page)
+
+    async def run(self, session):
+        """Watch for stalls until cancelled"""
+        while True:
+            await asyncio.sleep(self.check_interval)
+            if not should_continue():
+                continue
+            for target, state in self.targets.items():
+                if state["level"] and self.last_progress(target) > state["last_action"]:
+                    log(f"🐕 Progress resumed on the {target} page after watchdog level {state['level']}")
+                    self.stats["recoveries"] += 1
+                    state["level"] = self.stats["level"][target] = 0
+                if self.stalled_for(target) >= self.stall_window:
+                    await self.escalate(session, target)
+
+    def snapshot(self):
+        return self.stats
+
+watchdog = StallWatchdog(WATCHDOG)
+
+# ---------------------- 🔬 PROFILING ----------------------
+PROFILING_HOOKS = ["cprofile", "asyncio_debug", "loop_lag", "tracemalloc", "playwright_trace"]
+
+class Profiler:
+    """Opt-in profiling hooks for the worker, all writing into one per-run artifact directory.
+
+    Hooks are chosen with profiling.hooks in config.json or the X_PROFILE
+    environment variable (comma-separated names, or "all"):
+    cprofile (pstats dump plus a text summary), asyncio_debug (slow callbacks
+    logged to asyncio_debug.log), loop_lag (event-loop lag monitor),
+    tracemalloc (periodic snapshots and top allocation growth) and
+    playwright_trace (a trace zip of the first playwright_trace_seconds).
+    """
+
+    def __init__(self, settings):
+        requested = os.getenv("X_PROFILE")
+        hooks = requested.split(",") if requested is not None else settings.get("hooks", [])
+        hooks = [hook.strip() for hook in hooks if hook.strip()]
+        self.hooks = set(PROFILING_HOOKS if "all" in hooks else hooks)
+        self.settings = settings
+        self.run_dir = None
+        self.profile = None
+        self.tasks = []
+        self.tracing = False
+        self.lag = {"samples": 0, "total_ms": 0.0, "max_ms": 0.0, "over_threshold": 0}
+        self.tracemalloc_snapshots = 0
+        self._first_snapshot = None
+
+    def enabled(self, hook):
+        return hook in self.hooks
+
+    def start(self):
+        """Start the hooks that wrap the whole run (before the event loop exists)"""
+        if not self.hooks:
+            return
+        unknown = self.hooks - set(PROFILING_HOOKS)
+        if unknown:
+            log(f"⚠️ Unknown profiling hooks ignored: {', '.join(sorted(unknown))}", "warning")
+        self.run_dir = os.path.join(self.settings.get("output_dir", "logs/profiles"),
+                                    time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}")
+        os.makedirs(self.run_dir, exist_ok=True)
+        log(f"🔬 Profiling ({', '.join(sorted(self.hooks & set(PROFILING_HOOKS)))}) into {self.run_dir}")
+
+        if self.enabled("asyncio_debug"):
+            handler = logging.FileHandler(os.path.join(self.run_dir, "asyncio_debug.log"))
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+            asyncio_logger = logging.getLogger("asyncio")
+            asyncio_logger.addHandler(handler)
+            asyncio_logger.setLevel(logging.DEBUG)
+        if self.enabled("tracemalloc"):
+            tracemalloc.start(self.settings.get("tracemalloc_frames", 10))
+        if self.enabled("cprofile"):
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    async def start_async(self, context):
+        """Start the hooks that need the running loop or the browser context"""
+        if not self.hooks:
+            return
+        if self.enabled("asyncio_debug"):
+            asyncio.get_running_loop().slow_callback_duration = self.settings.get("slow_callback_ms", 100) / 1000
+        if self.enabled("loop_lag"):
+            self.tasks.append(asyncio.create_task(self._loop_lag_monitor()))
+        if self.enabled("tracemalloc"):
+            self.tasks.append(asyncio.create_task(self._tracemalloc_loop()))
+        if self.enabled("playwright_trace"):
+            await context.tracing.start(screenshots=True, snapshots=True)
+            self.tracing = True
+            self.tasks.append(asyncio.create_task(self._stop_trace_after(context)))
+
+    async def _loop_lag_monitor(self):
+        """Measure how late the loop wakes a sleeping task; blocking calls show up as lag"""
+        interval = self.settings.get("loop_lag_interval", 0.5)
+        warn_ms = self.settings.get("loop_lag_warn_ms", 250)
+        while True:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            lag_ms = max(0.0, (time.perf_counter() - expected) * 1000)
+            self.lag["samples"] += 1
+            self.lag["total_ms"] += lag_ms
+            self.lag["max_ms"] = max(self.lag["max_ms"], lag_ms)
+            if lag_ms >= warn_ms:
+                self.lag["over_threshold"] += 1
+                event_log.emit("loop_lag", "warning", lag_ms=round(lag_ms))
+
+    def _tracemalloc_snapshot(self):
+        snapshot = tracemalloc.take_snapshot()
+        self.tracemalloc_snapshots += 1
+        snapshot.dump(os.path.join(self.run_dir, f"tracemalloc-{self.tracemalloc_snapshots:03d}.snapshot"))
+        if self.tracemalloc_snapshots == 1:
+            self._first_snapshot = snapshot
+            return
+        growth = snapshot.compare_to(self._first_snapshot, "lineno")[:25]
+        with open(os.path.join(self.run_dir, f"tracemalloc-{self.tracemalloc_snapshots:03d}-growth.txt"), "w") as f:
+            f.write("\n".join(str(stat) for stat in growth) + "\n")
+
+    async def _tracemalloc_loop(self):
+        interval = self.settings.get("tracemalloc_interval", 300)
+        while True:
+            await asyncio.to_thread(self._tracemalloc_snapshot)
+            await asyncio.sleep(interval)
+
+    async def _stop_trace_after(self, context):
+        await asyncio.sleep(self.settings.get("playwright_trace_seconds", 120))
+        await self._stop_trace(context)
+
+    async def _stop_trace(self, context):
+        if self.tracing:
+            self.tracing = False
+            await context.tracing.stop(path=os.path.join(self.run_dir, "playwright-trace.zip"))
+            log("🔬 Playwright trace saved", "debug")
+
+    async def stop_async(self, context):
+        """Stop loop-bound hooks; the trace is saved before the browser closes"""
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+        try:
+            await self._stop_trace(context)
+        except Exception as e:
+            log_error("profiling", e)
+
+    def stop(self):
+        """Write the remaining artifacts once the event loop has finished"""
+        if not self.run_dir:
+            return
+        if self.profile:
+            self.profile.disable()
+            self.profile.dump_stats(os.path.join(self.run_dir, "profile.pstats"))
+            with open(os.path.join(self.run_dir, "profile.txt"), "w") as f:
+                pstats.Stats(self.profile, stream=f).sort_stats("cumulative").print_stats(60)
+        if tracemalloc.is_tracing():
+            self._tracemalloc_snapshot()
+            tracemalloc.stop()
+        samples = self.lag["samples"]
+        summary = {
+            "hooks": sorted(self.hooks),
+            "loop_lag": {
+                "samples": samples,
+                "avg_ms": round(self.lag["total_ms"] / samples, 2) if samples else None,
+                "max_ms": round(self.lag["max_ms"], 2),
+                "over_threshold": self.lag["over_threshold"]
+            },
+            "tracemalloc_snapshots": self.tracemalloc_snapshots
+        }
+        with open(os.path.join(self.run_dir, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+        log(f"🔬 Profiling artifacts written to {self.run_dir}")
+
+profiler = Profiler(PROFILING)
+
 # ---------------------- 🚀 MAIN FUNCTION ----------------------
 async def main():
     """Main function to run the X automation"""
     global automation_should_stop
-    print("🤖 Starting X automation with Playwright and persistent session...")
+    log(f"🤖 Starting X automation with Playwright ({SESSION_MODE} session)...")
 
     tweets_processed = 0
     replies_sent = 0
+    # Texts of tweets we've already replied to, oldest first so the checkpoint keeps the newest
+    replied_tweets = OrderedDict()
+    # Only checkpoint once the previous one has been read back, so an early failure can't wipe it
+    checkpoint_loaded = False
     
     async with async_playwright() as p:
-        # Launch the browser with persistent context to maintain login session
-        print(f"📂 Using persistent session from: {USER_DATA_DIR}")
-        browser = await p.chromium.launch_persistent_context(
-            user_data_dir=USER_DATA_DIR,
-            headless=True,  # Must be True in containers
-            args=[
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-                "--disable-dev-shm-usage",
-                "--disable-gpu",
-                "--no-first-run",
-                "--disable-extensions",
-                "--disable-background-timer-throttling",
-                "--disable-renderer-backgrounding"
-            ]
-        )
+        # Launch the browser from the persistent profile or a session snapshot
+        session = BrowserSession(p)
+        page = await session.start()
         
-        # Use the first page in the browser
-        page = browser.pages[0]
-        if len(browser.pages) == 0:
-            page = await browser.new_page()
-        
-        # Set default navigation timeout
-        page.set_default_timeout(30000)
+        # Set default navigation timeout and the timeline listeners
+        prepare_page(page)
+        await profiler.start_async(session.context)
+
+        # Keep the lock file's heartbeat fresh so the dashboard can judge liveness
+        heartbeat_task = asyncio.create_task(heartbeat_loop())
+        analytics_task = asyncio.create_task(analytics_flush_loop())
+        snapshot_task = None
+        watchdog_task = None
+        actor_task = None
         
         try:
-            # Navigate to X home page
-            print("🌐 Navigating to X home page...")
-            await page.goto("https://x.com/home", wait_until="domcontentloaded")
+            # Decide the login path from cookies before paying for a page load
+            has_auth_cookies, auth_reason = await check_auth_cookies(session.context)
+            log(f"🍪 Cookie login check: {auth_reason}")
             
-            # Check if we're already logged in
-            is_logged_in = await check_login_status(page)
+            is_logged_in = False
+            if has_auth_cookies or not has_credentials():
+                # Navigate to X home page
+                log("🌐 Navigating to X home page...")
+                await page.goto("https://x.com/home", wait_until="domcontentloaded")
+                
+                # Cookies can outlive a session X has revoked, so confirm on the page
+                if has_auth_cookies:
+                    is_logged_in = await check_login_status(page)
             
             # If not logged in and credentials are provided, log in
-            if not is_logged_in and X_USERNAME != "your_username" and X_PASSWORD != "your_password":
-                print("🔑 Using provided credentials to log in...")
+            if not is_logged_in and has_credentials():
+                log("🔑 Using provided credentials to log in...")
                 login_success = await login_to_x(page, X_USERNAME, X_PASSWORD)
-                if not login_success:
-                    print("⚠️ Login failed. Please check your credentials or log in manually.")
-                    print("⏳ Waiting for manual login...")
+                if login_success:
+                    await session.save_snapshot()
+                else:
+                    log("⚠️ Login failed. Please check your credentials or log in manually.", "warning")
+                    log("⏳ Waiting for manual login...")
             
             # If not logged in and no credentials, wait for manual login
             elif not is_logged_in:
-                print("⚠️ No login credentials provided. Please log in manually.")
-                print("⏳ The script will wait for you to log in...")
+                log("⚠️ No login credentials provided. Please log in manually.", "warning")
+                log("⏳ The script will wait for you to log in...")
             
             # Wait for the home page to be fully loaded with tweets
             if not await wait_for_home_page_loaded(page):
-                print("❌ Failed to load home page properly. Please check your connection and try again.")
-                await browser.close()
+                log("❌ Failed to load home page properly. Please check your connection and try again.", "error")
                 return
+
+            # Logged in with a timeline: snapshot the session (also covers manual logins)
+            session.home_ready()
+            await session.save_snapshot()
+            snapshot_task = asyncio.create_task(snapshot_refresh_loop(session))
+            # From here on a stalled page gets escalating recovery
+            watchdog_task = asyncio.create_task(watchdog.run(session))
+
+            def reply_posted(record):
+                nonlocal replies_sent
+                replied_tweets[record["text"]] = None
+                replies_sent += 1
+                mark_progress()
+                update_stats(tweets_processed, replies_sent, "Running")
+
+            # Replies happen on a second page, so scanning never waits on them
+            if POST_REPLIES:
+                await session.open_actor_page()
+                actor_task = asyncio.create_task(reply_actor.run(session, replied_tweets, reply_posted))
                 
             # Additional wait to ensure everything is stable
             await random_delay(3, 5)
@@ -834,239 +3936,257 @@ async def main():
             # Check for any verification dialogs that might appear on startup
             await handle_verification_dialog(page)
             
-            # Keep track of tweets we've already replied to
-            replied_tweets = set()
+            # Status ids already on screen at some point, to measure what each scroll adds
+            seen_tweet_ids = set()
+            # None until the first scroll: the initial view always gets extracted
+            new_tweets = None
+
+            # Count what earlier runs already spent today against the daily budget
+            today_totals = analytics.read_totals("day", usage_tracker.day * 86400)
+            usage_tracker.seed_today({
+                "calls": today_totals.get("llm_calls", 0),
+                "errors": today_totals.get("llm_errors", 0),
+                "prompt_tokens": today_totals.get("prompt_tokens", 0),
+                "completion_tokens": today_totals.get("completion_tokens", 0),
+                "cost_usd": today_totals.get("cost_usd", 0.0)
+            })
+
+            # Carry over totals, known tweets and unfinished work from the previous run
+            previous = checkpoint.load() if RESUME_FROM_CHECKPOINT else None
+            if previous:
+                tweets_processed = previous.get("tweets_processed", 0)
+                replies_sent = previous.get("replies_sent", 0)
+                replied_tweets.update(OrderedDict.fromkeys(previous.get("replied_tweets", [])))
+                for record in previous.get("pending", []):
+                    record["element"] = None
+                    if candidate_queue.push(record):
+                        near_duplicates.remember(record.get("fingerprint"), record["id"], "queued")
+                log(f"💾 Resumed from checkpoint: {tweets_processed} tweets processed, {replies_sent} replies sent, "
+                    f"{len(checkpoint.processed_ids)} known tweets, {len(candidate_queue)} candidates queued")
+                event_log.emit("run_resumed", saved_at=previous.get("saved_at"), tweets_processed=tweets_processed,
+                               replies_sent=replies_sent, pending=len(candidate_queue))
+            checkpoint_loaded = True
+
+            last_auth_check = time.time()
+            logged_out = False
 
             # Initialize stats
             update_stats(tweets_processed, replies_sent, "Running")
+            event_log.emit("run_started", keywords=KEYWORDS, scroll_count=SCROLL_COUNT, post_replies=POST_REPLIES)
 
             # ---------------------- 🔁 MAIN LOOP ----------------------
             for scroll_index in range(SCROLL_COUNT):
                 # Check if we should stop
                 if not should_continue():
-                    print("\n🛑 Stopping automation as requested...")
+                    log("🛑 Stopping automation as requested...")
                     break
 
-                print(f"\n🔁 Scroll #{scroll_index + 1}")
+                log(f"🔁 Scroll #{scroll_index + 1}")
+                # The stall watchdog may have swapped the page or relaunched the context
+                page = session.page
+                # Article handles live only until this scroll is done
+                scroll_scope = HandleScope("scroll")
+
+                try:
+                    # A dry timeline gets reloaded rather than scrolled further
+                    if idle_backoff.should_refresh() and await refresh_timeline(page):
+                        new_tweets = None
 
-                # Check for and handle any verification dialogs
-                await handle_verification_dialog(page)
+                    # Check for and handle any verification dialogs
+                    await handle_verification_dialog(page)
                 
-                # Check for and close any open reply modals before proceeding
-                await close_modal_if_open(page)
+                    # Check for and close any open reply modals before proceeding
+                    await close_modal_if_open(page)
                 
-                # Get tweets
-                tweets = await page.query_selector_all('article[data-testid="tweet"]')
-                print(f"📊 Found {len(tweets)} tweets in current view")
+                    if timeline_ingestor.active():
+                        # Records parsed from timeline responses; the DOM is only needed later for the reply control
+                        tweets = timeline_ingestor.drain()
+                        log(f"📡 {len(tweets)} new tweets from timeline responses")
+                    # Nothing new since the last pass means nothing new to extract
+                    elif new_tweets == 0:
+                        tweets = []
+                        log("💤 No new tweets in view, skipping extraction", "debug")
+                    else:
+                        tweets = scroll_scope.track_all(await page.query_selector_all('article[data-testid="tweet"]'))
+                        log(f"📊 Found {len(tweets)} tweets in current view")
                 
-                if DEBUG_MODE and len(tweets) > 0:
-                    await save_screenshot(page, f"tweets_scroll_{scroll_index}.png")
+                    if DEBUG_MODE and len(tweets) > 0:
+                        await save_screenshot(page, f"tweets_scroll_{scroll_index}.png")
                 
-                for tweet_index, tweet in enumerate(tweets):
-                    # Check if we should stop before processing each tweet
-                    if not should_continue():
-                        print("\n🛑 Stopping automation as requested...")
-                        break
+                    # Pass 1: extract and filter everything in view
+                    candidates = []
+                    seen_texts = []
+                    matched_count = 0
+                    for tweet_index, tweet in enumerate(tweets):
+                        # Check if we should stop before processing each tweet
+                        if not should_continue():
+                            log("🛑 Stopping automation as requested...")
+                            break
 
-                    try:
-                        # Extract tweet text
-                        tweet_text_element = await tweet.query_selector('div[data-testid="tweetText"]')
-                        if not tweet_text_element:
-                            if DEBUG_MODE:
-                                print(f"⚠️ No tweet text found for tweet #{tweet_index}")
-                            continue
-                        
-                        tweet_text = await tweet_text_element.inner_text()
-                        tweet_text = tweet_text.strip()
+                        try:
+                            record = tweet if isinstance(tweet, dict) else await extract_tweet_record(tweet)
+                            if not record:
+                                log(f"⚠️ No tweet text found for tweet #{tweet_index}", "debug")
+                                continue
 
-                        # Update tweets processed count
-                        tweets_processed += 1
-                        update_stats(tweets_processed, replies_sent, "Running")
+                            tweet_text = record["text"]
+                            tweet_id = record["id"]
+                            # Already handled by this or an earlier run
+                            if checkpoint.is_known(tweet_id):
+                                continue
+                            checkpoint.mark_processed(tweet_id)
+                            seen_texts.append(tweet_text)
+                            event_log.emit("tweet_seen", tweet_id=tweet_id, scroll=scroll_index, chars=len(tweet_text))
 
-                        # Skip if empty or already replied
-                        if not tweet_text or tweet_text in replied_tweets:
-                            continue
+                            # Update tweets processed count
+                            tweets_processed += 1
+                            analytics.record("scanned")
+                            mark_progress()
 
-                              # ---- START: Add this code block around line 650 ----
-                        try:
-                            # Attempt to find the author's handle element within the tweet.
-                            author_element = await tweet.query_selector('div[data-testid="User-Name"] span > span:has-text("@")')
-                            if not author_element:
-                                # Fallback selector attempt (adjust based on actual X structure if the above fails)
-                                # This looks for a link starting with '/' (like a profile link) containing a span with '@'
-                                author_element = await tweet.query_selector('a[role="link"][href^="/"]:has(span:has-text("@"))')
-
-                            if author_element:
-                                author_handle = await author_element.inner_text()
-                                author_handle = author_handle.strip() # Expected format: "@username"
-
-                                # Compare the found handle with the bot's username (case-insensitive)
-                                # It's safer to compare without the '@' symbol
-                                if author_handle.lstrip('@').lower() == X_USERNAME.lower():
-                                    if DEBUG_MODE:
-                                        print(f"🚮 Skipping own tweet by {author_handle} (Tweet Index: {tweet_index})")
-                                    continue # Skip the rest of the loop iteration for this tweet
-
-                            # Optional: Handle cases where the author handle couldn't be found
-                            # else:
-                            #    if DEBUG_MODE:
-                            #        print(f"⚠️ Could not find author handle for tweet #{tweet_index}. Proceeding with caution.")
-                                # If you want to be extra safe, you could 'continue' here too,
-                                # to avoid replying if the author isn't confirmed *not* to be the bot.
-                                # continue
-
-                        except Exception as author_ex:
-                            if DEBUG_MODE:
-                                print(f"⚠️ Error extracting author handle for tweet #{tweet_index}: {author_ex}")
-                            # Optional: Decide if you want to skip ('continue') on error
-                            # continue
-                        # ---- END: Added code block ----
+                            # Skip if already replied
+                            if tweet_text in replied_tweets:
+                                continue
+
+                            # Compare the author's handle with the bot's username (case-insensitive, without the '@')
+                            if record["author"] and X_USERNAME and record["author"].lstrip('@').lower() == X_USERNAME.lower():
+                                log(f"🚮 Skipping own tweet by {record['author']} (Tweet Index: {tweet_index})", "debug")
+                                continue
                         
-                        # Check for keywords
-                        if any(re.search(r'\b' + re.escape(keyword.lower()) + r'\b', tweet_text.lower()) for keyword in KEYWORDS):
-                            print(f"\n🔥 Found keyword match:\n{tweet_text[:200]}")
+                            # Check for keywords
+                            matched_keywords = match_keywords(tweet_text)
+                            if not matched_keywords:
+                                continue
+                            record["keywords"] = matched_keywords
+                            event_log.emit("tweet_matched", tweet_id=tweet_id, keywords=matched_keywords, text=tweet_text[:200])
+                            analytics.record("matched")
+                            matched_count += 1
 
                             # Add verification check right here
-                            if not await is_verified(tweet):
-                                print("❌ Not verified, skipping...")
+                            if not record["verified"]:
+                                log("❌ Not verified, skipping...")
+                                continue
+
+                            # Copypasta and lightly edited reposts reuse the decision made for the first copy
+                            record["fingerprint"] = near_duplicates.fingerprint(tweet_text)
+                            earlier = near_duplicates.lookup(record["fingerprint"], tweet_id)
+                            if earlier:
+                                near_duplicates.record_skip(earlier["decision"])
+                                event_log.emit("near_duplicate_skipped", tweet_id=tweet_id,
+                                               original_id=earlier["tweet_id"], decision=earlier["decision"])
                                 continue
+                            near_duplicates.remember(record["fingerprint"], tweet_id, "scored")
 
-                            print("✅ Verified account - generating reply...")
-
-                            # Generate reply
-                            valuable_reply = await generate_valuable_reply(tweet_text)
-                            print(f"💡 Reply: {valuable_reply}")
-                            
-                            if POST_REPLIES:
-                                try:
-                                    # Find reply button using our improved function
-                                    await random_delay(1, 2)  # Add delay before looking for reply button
-                                    
-                                    if DEBUG_MODE:
-                                        print(f"🔍 Analyzing tweet #{tweet_index} for reply button")
-                                        await save_screenshot(page, f"tweet_{tweet_index}_before_reply.png")
-                                    
-                                    reply_button = await find_reply_button(tweet, page)
-                                    
-                                    if not reply_button:
-                                        print("⚠️ Reply button not found, skipping...")
-                                        continue
-                                    
-                                    # Scroll to make sure the button is visible
-                                    await reply_button.scroll_into_view_if_needed()
-                                    await random_delay()
-                                    
-                                    # Click the reply button
-                                    try:
-                                        await reply_button.click()
-                                    except Exception as click_error:
-                                        print(f"⚠️ Error clicking reply button: {click_error}")
-                                        # Try JavaScript click as fallback
-                                        try:
-                                            await page.evaluate("""function(button) {
-                                                button.click();
-                                            }""", reply_button)
-                                        except Exception:
-                                            print("⚠️ JavaScript click also failed, skipping...")
-                                            continue
-                                    
-                                    await random_delay(2, 3)
-                                    
-                                    # Check if reply dialog opened using our improved detection
-                                    if DEBUG_MODE:
-                                        await save_screenshot(page, f"after_reply_click_{tweet_index}.png")
-                                    
-                                    # Wait for the reply dialog to appear using our improved detection
-                                    dialog_opened = await wait_for_reply_dialog(page)
-                                    if not dialog_opened:
-                                        print("⚠️ Reply dialog did not open, skipping...")
-                                        continue
-                                    
-                                    # Enter reply with human-like typing
-                                    reply_selectors = [
-                                        'div[aria-label="Tweet text"]', 
-                                        'div[data-testid="tweetTextarea_0"]',
-                                        'div[role="textbox"][aria-label="Tweet text"]',
-                                        'div[role="textbox"]'
-                                    ]
-                                    
-                                    typing_success = False
-                                    for selector in reply_selectors:
-                                        try:
-                                            if await page.query_selector(selector):
-                                                if DEBUG_MODE:
-                                                    print(f"✅ Found reply box with selector: {selector}")
-                                                
-                                                if await human_like_typing(page, selector, valuable_reply):
-                                                    typing_success = True
-                                                    break
-                                        except Exception:
-                                            if DEBUG_MODE:
-                                                print(f"⚠️ Selector failed: {selector}")
-                                    
-                                    if not typing_success:
-                                        print("⚠️ Reply box not found or typing failed, closing modal...")
-                                        await close_modal_if_open(page)
-                                        continue
-                                    
-                                    await random_delay(1, 2)
-                                    
-                                    # Try all available methods to submit the reply
-                                    submission_start_time = time.time()
-                                    submission_success = False
-                                    
-                                    while time.time() - submission_start_time < REPLY_SUBMISSION_TIMEOUT:
-                                        if await try_all_reply_submission_methods(page):
-                                            submission_success = True
-                                            break
-                                        
-                                        # If we're still here, none of the methods worked
-                                        # Wait a bit and try again
-                                        await random_delay(2, 3)
-                                    
-                                    if submission_success:
-                                        print("✅ Reply submitted successfully!")
-                                        # Add to replied set
-                                        replied_tweets.add(tweet_text)
-                                        # Update replies sent count
-                                        replies_sent += 1
-                                        update_stats(tweets_processed, replies_sent, "Running")
-                                        # Wait longer after posting to avoid rate limiting
-                                        await random_delay(4, 7)
-                                    else:
-                                        print("❌ Failed to submit reply after multiple attempts")
-                                        # Close the modal and continue
-                                        await close_modal_if_open(page)
-                                    
-                                except Exception as e:
-                                    print(f"⚠️ Error during reply process: {e}")
-                                    # Try to close any open dialogs
-                                    await close_modal_if_open(page)
+                            candidates.append(record)
                     
-                    except Exception as e:
-                        print(f"⚠️ Error processing tweet: {e}")
-                        continue
+                        except Exception as e:
+                            log_error("tweet", e)
+                            continue
+
+                    if new_tweets is not None:
+                        idle_backoff.observe(new_tweets, matched_count)
+                    update_stats(tweets_processed, replies_sent, "Running")
+
+                    # Pass 2: rank this scroll's candidates locally; only the best are queued
+                    relevance_scorer.observe(seen_texts)
+                    ranked = relevance_scorer.score_batch(candidates)
+                    above_threshold = [r for r in ranked if r["score"] >= SCORE_THRESHOLD]
+                    selected = above_threshold[:MAX_CANDIDATES_PER_SCROLL]
+
+                    scoring_stats["scored"] += len(ranked)
+                    scoring_stats["selected"] += len(selected)
+                    scoring_stats["below_threshold"] += len(ranked) - len(above_threshold)
+                    scoring_stats["over_scroll_limit"] += len(above_threshold) - len(selected)
+                    for record in ranked:
+                        event_log.emit("tweet_scored", "debug", tweet_id=record["id"], score=record["score"],
+                                       parts=record["score_parts"], selected=record in selected)
+                    for record in selected:
+                        if candidate_queue.push(record):
+                            near_duplicates.remember(record["fingerprint"], record["id"], "queued")
+
+                    # Re-check the session from cookies so an expiry is caught before a batch of replies fails
+                    if time.time() - last_auth_check >= AUTH_CHECK_INTERVAL:
+                        last_auth_check = time.time()
+                        authed, auth_reason = await check_auth_cookies(session.context)
+                        if not authed:
+                            log(f"🔒 Session lost mid-run: {auth_reason}", "warning")
+                            event_log.emit("auth_lost", "warning", reason=auth_reason)
+                            if not has_credentials():
+                                log("❌ Logged out and no credentials to log back in. Stopping.", "error")
+                                logged_out = True
+                                break
+                            if not await login_to_x(page, X_USERNAME, X_PASSWORD) or not await wait_for_home_page_loaded(page):
+                                log("❌ Could not log back in. Stopping.", "error")
+                                logged_out = True
+                                break
+                            await session.save_snapshot()
+                            new_tweets = None
+
+                    # Dry run: no UI and no pacing, generate everything queued with bounded concurrency
+                    while not POST_REPLIES and should_continue():
+                        record = candidate_queue.pop()
+                        if record is None:
+                            break
+                        await dispatch_dry_run(record)
+
+                    # The actor reaches queued candidates by permalink; the scanner's handles are done
+                    for record in candidates:
+                        record["element"] = None
+                    await scroll_scope.dispose()
                 
-                # Check for and close any open modals before scrolling
-                await close_modal_if_open(page)
+                    if checkpoint.due():
+                        await checkpoint.save(tweets_processed, replies_sent, replied_tweets)
+
+                    # Check for and close any open modals before scrolling
+                    await close_modal_if_open(page)
                 
-                # Scroll down with randomized behavior
-                scroll_amount = random.randint(500, 1000)
-                await page.evaluate("""function(scrollAmount) {
-                    window.scrollBy(0, scrollAmount);
-                }""", scroll_amount)
+                    # Quiet timeline: back off before scrolling again
+                    backoff = idle_backoff.delay()
+                    if backoff:
+                        log(f"💤 {idle_backoff.idle_streak} idle scrolls in a row, waiting {backoff:.0f}s")
+                        await idle_wait(backoff)
+                        if not should_continue():
+                            log("🛑 Stopping automation as requested...")
+                            break
+
+                    # Scroll down and wait until the next batch of tweets is actually there
+                    new_tweets, waited, reason = await scroll_timeline(page, seen_tweet_ids)
+                    mark_progress()
+                    log(f"⏱️ Scroll produced {new_tweets} new tweets after {waited:.2f}s ({reason})")
+                    event_log.emit("scroll_done", scroll=scroll_index, new_tweets=new_tweets,
+                                   waited_ms=round(waited * 1000), reason=reason)
+                except Exception as e:
+                    # Whatever was in flight on a page the watchdog replaced fails; carry on with the new one
+                    log_error("scroll", e, scroll=scroll_index)
+                    await scroll_scope.dispose()
+                    new_tweets = None
+                    await asyncio.sleep(2)
                 
-                # Check if we should stop before scrolling
+                # Check if we should stop before the next scroll
                 if not should_continue():
-                    print("\n🛑 Stopping automation as requested...")
+                    log("🛑 Stopping automation as requested...")
                     break
 
-                # Use longer random delays between scrolls to avoid throttling
-                scroll_delay = await random_delay(MIN_SCROLL_DELAY, MAX_SCROLL_DELAY)
-                print(f"⏱️ Waiting {scroll_delay:.2f}s before next scroll")
+            # Scanning is done, but what it queued still gets replies at the configured pacing
+            if actor_task and not logged_out and len(candidate_queue) and should_continue():
+                log(f"⏳ Scan finished, replying to {len(candidate_queue)} queued candidates...")
+                while should_continue() and not actor_task.done() and (len(candidate_queue) or reply_actor.current):
+                    await asyncio.sleep(1)
+                    # Waiting on the pacing is progress, as with idle backoff
+                    mark_progress()
+                    if checkpoint.due():
+                        await checkpoint.save(tweets_processed, replies_sent, replied_tweets)
+
+            # The last reply in flight finishes the way it would have mid-run
+            if actor_task and not actor_task.done():
+                await reply_actor.wait_idle()
+
+            # Let in-flight dry-run generations finish unless we were asked to stop
+            if dry_run_tasks and should_continue():
+                log(f"⏳ Waiting for {len(dry_run_tasks)} dry-run generations to finish...")
+                await asyncio.gather(*dry_run_tasks, return_exceptions=True)
         
         except Exception as e:
-            print(f"❌ Fatal error: {e}")
+            log_error("fatal", e)
             if DEBUG_MODE:
                 await save_screenshot(page, "fatal_error.png")
         
@@ -1074,9 +4194,36 @@ async def main():
             # ---------------------- ✅ DONE ----------------------
             final_status = "Stopped" if should_continue() else "Stopped by user"
             update_stats(tweets_processed, replies_sent, final_status)
-            print(f"\n🎉 Finished scrolling & replying. {final_status}")
-            print("📝 Session has been saved and will be reused next time.")
-            await browser.close()
+            event_log.emit("run_stopped", status=final_status, tweets_processed=tweets_processed, replies_sent=replies_sent)
+            log(f"🎉 Finished scrolling & replying. {final_status}")
+            log("📝 Session has been saved and will be reused next time.")
+            heartbeat_task.cancel()
+            analytics_task.cancel()
+            if watchdog_task:
+                watchdog_task.cancel()
+            if actor_task:
+                actor_task.cancel()
+            for task in list(dry_run_tasks):
+                task.cancel()
+            dry_run_writer.close()
+            if snapshot_task:
+                snapshot_task.cancel()
+                await session.save_snapshot()
+            if checkpoint_loaded:
+                await checkpoint.save(tweets_processed, replies_sent, replied_tweets)
+            await flush_analytics()
+            await profiler.stop_async(session.context)
+            await session.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if not acquire_worker_lock():
+        log(f"❌ Another automation worker already holds {automation_lock_file}. Exiting.", "error")
+        event_log.close()
+        sys.exit(f"Another automation worker already holds {automation_lock_file}")
+    profiler.start()
+    try:
+        asyncio.run(main(), debug=profiler.enabled("asyncio_debug"))
+    finally:
+        profiler.stop()
+        release_worker_lock()
+        event_log.close()
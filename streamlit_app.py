@@ -5,15 +5,26 @@ import os
 from datetime import datetime
 import json
 import signal
+import sqlite3
 import psutil
+from collections import deque
 from dotenv import load_dotenv
 
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows; fall back to checking the PID recorded in the lock file
+    fcntl = None
+
 # Load environment variables from .env file
 load_dotenv()
 
 # Global variable to hold the subprocess
 automation_process = None
 
+# Lock file the worker holds while it runs (see X-final.py)
+automation_lock_file = "automation.lock"
+
 # Global variables to control the automation
 automation_running = False
 automation_stats = {
@@ -34,6 +45,110 @@ default_config = {
     "max_action_delay": 2.5,
     "debug_mode": True,
     "max_reply_attempts": 3,
+    "heartbeat_interval": 5,
+    "stall_threshold": 300,
+    "log_file": "logs/automation_events.jsonl",
+    "log_max_bytes": 5242880,
+    "log_backup_count": 5,
+    "log_sampling": {"tweet_seen": 0.25},
+    "log_to_stdout": False,
+    "analytics_db": "data/automation_metrics.db",
+    "reply_model": "gpt-4",
+    "gate_model": "gpt-3.5-turbo",
+    "gate_mode": "model",
+    "gate_threshold": 6,
+    "stream_replies": True,
+    "max_reply_chars": 280,
+    "reply_candidates": {
+        "n": 3,
+        "max_attempts": 2,
+        "max_similarity": 0.6,
+        "recent_replies": 50,
+        "banned_phrases": ["as an ai", "great point", "couldn't agree more", "in today's fast-paced world",
+                           "game-changer", "let's dive in"]
+    },
+    "keyword_weights": {},
+    "topic_profile": "",
+    "score_weights": {"keywords": 0.35, "topic": 0.35, "length": 0.1, "engagement": 0.2},
+    "score_threshold": 0.3,
+    "max_candidates_per_scroll": 3,
+    "candidate_queue": {
+        "max_size": 50,
+        "max_age_minutes": 120,
+        "freshness_half_life_minutes": 45,
+        "reply_interval": 45
+    },
+    "near_duplicates": {
+        "max_distance": 3,
+        "max_entries": 5000,
+        "min_words": 5
+    },
+    "scroll_readiness": {
+        "quiet_ms": 400,
+        "idle_quiet_ms": 1500,
+        "poll_interval": 0.25
+    },
+    "idle_backoff": {
+        "base_wait": 10,
+        "max_wait": 300,
+        "refresh_after": 3
+    },
+    "ingestion_mode": "network",
+    "session_mode": "profile",
+    "session_snapshot": "data/storage_state.json",
+    "snapshot_refresh_interval": 1800,
+    "checkpoint_file": "data/checkpoint.json",
+    "checkpoint_interval": 60,
+    "resume_from_checkpoint": True,
+    "dry_run_output": "data/dry_run_replies.jsonl",
+    "dry_run_concurrency": 4,
+    "profiling": {
+        "hooks": [],
+        "output_dir": "logs/profiles",
+        "slow_callback_ms": 100,
+        "loop_lag_interval": 0.5,
+        "loop_lag_warn_ms": 250,
+        "tracemalloc_interval": 300,
+        "tracemalloc_frames": 10,
+        "playwright_trace_seconds": 120
+    },
+    "auth_check_interval": 120,
+    "watchdog": {
+        "stall_window": 180,
+        "check_interval": 10,
+        "action_timeout": 60
+    },
+    "adaptive_timeouts": {
+        "percentile": 0.95,
+        "margin": 1.5,
+        "window": 50,
+        "min_samples": 5,
+        "bounds": {
+            "home_load": [10, 120],
+            "tweet_poll": [4, 60],
+            "login_check": [2, 20],
+            "dialog": [2, 30],
+            "submission": [5, 60]
+        }
+    },
+    "llm_resilience": {
+        "timeout": 30,
+        "max_retries": 3,
+        "backoff_base": 1.0,
+        "backoff_max": 30,
+        "breaker_failure_threshold": 5,
+        "breaker_cooldown": 60
+    },
+    "generation_budget": {
+        "max_tokens_per_run": None,
+        "max_cost_per_run": 2.0,
+        "max_cost_per_day": 10.0,
+        "max_error_rate": 0.5,
+        "error_window": 10,
+        "error_pause_seconds": 300,
+        "throttle_fraction": 0.8,
+        "throttle_interval": 30
+    },
     "reply_prompt": """As an experienced industry leader, reply to "{tweet_text}" in under *260 characters*. Match their tone, be respectful, add insight from experience, never mention yourself, avoid clichés/slang, and invite meaningful dialogue."""
 }
 
@@ -63,8 +178,10 @@ def save_config(config):
 
 def save_stats():
     """Save automation statistics to file"""
-    with open("automation_stats.json", "w") as f:
+    # Write-then-rename so a concurrent reader never sees a half-written file
+    with open("automation_stats.json.tmp", "w") as f:
         json.dump(automation_stats, f, default=str)
+    os.replace("automation_stats.json.tmp", "automation_stats.json")
 
 def load_stats():
     """Load automation statistics from file"""
@@ -76,6 +193,124 @@ def load_stats():
     except Exception:
         pass
 
+class LogTail:
+    """Follow the worker's JSONL event log by byte offset.
+
+    Each poll reads only the bytes appended since the previous one, starts over
+    when the file's inode changes (rotation) or it shrinks (truncation), and keeps
+    a bounded window of parsed events in memory.
+    """
+
+    def __init__(self, path, max_events=500, initial_bytes=256 * 1024, max_read_bytes=1024 * 1024):
+        self.path = path
+        self.events = deque(maxlen=max_events)
+        self.initial_bytes = initial_bytes
+        self.max_read_bytes = max_read_bytes
+        self.inode = None
+        self.offset = 0
+        self.partial = b""
+
+    def poll(self):
+        """Read newly appended events; returns how many were added"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return 0
+
+        skip_first_line = False
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            first_open = self.inode is None
+            self.inode = stat.st_ino
+            self.partial = b""
+            # On first open only the tail is interesting; after a rotation the new file is read from the start
+            self.offset = max(0, stat.st_size - self.initial_bytes) if first_open else 0
+            skip_first_line = self.offset > 0
+
+        if stat.st_size <= self.offset:
+            return 0
+
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read(self.max_read_bytes)
+        except OSError:
+            return 0
+        self.offset += len(data)
+
+        lines = (self.partial + data).split(b"\n")
+        # The last piece is an incomplete line (or empty); keep it for the next poll
+        self.partial = lines.pop()
+        if skip_first_line and lines:
+            lines = lines[1:]
+
+        added = 0
+        for line in lines:
+            try:
+                self.events.append(json.loads(line))
+                added += 1
+            except ValueError:
+                continue
+        return added
+
+    def query(self, event_types=None, tweet_id=None, limit=100):
+        """Newest-first events matching the given types and tweet ID"""
+        matches = []
+        for event in reversed(self.events):
+            if event_types and event.get("event") not in event_types:
+                continue
+            if tweet_id and str(event.get("tweet_id") or "") != tweet_id:
+                continue
+            matches.append(event)
+            if len(matches) >= limit:
+                break
+        return matches
+
+def get_log_tail(path):
+    """Per-session LogTail, recreated if the configured log file changes"""
+    tail = st.session_state.get("log_tail")
+    if tail is None or tail.path != path:
+        tail = LogTail(path)
+        st.session_state["log_tail"] = tail
+    tail.poll()
+    return tail
+
+def format_event_row(event):
+    """Flatten an event into a table row for display"""
+    details = {k: v for k, v in event.items() if k not in ("ts", "event", "level", "tweet_id", "msg")}
+    return {
+        "time": datetime.fromtimestamp(event.get("ts", 0)).strftime("%H:%M:%S"),
+        "event": event.get("event", ""),
+        "level": event.get("level", ""),
+        "tweet_id": event.get("tweet_id") or "",
+        "detail": event.get("msg") or json.dumps(details, ensure_ascii=False, default=str)
+    }
+
+# History ranges: label -> (rollup table, seconds of history to show)
+HISTORY_RANGES = {
+    "Last 6 hours": ("minute", 6 * 3600),
+    "Last 7 days": ("hour", 7 * 86400),
+    "Last 90 days": ("day", 90 * 86400)
+}
+
+@st.cache_data(ttl=15)
+def load_history(db_path, level, seconds):
+    """Read pre-aggregated metric rows for a time range from the worker's analytics store"""
+    if not os.path.exists(db_path):
+        return []
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=5)
+        try:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                f"SELECT * FROM metrics_{level} WHERE bucket >= ? ORDER BY bucket",
+                (time.time() - seconds,)
+            ).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return []
+
 def start_automation():
     """Start the automation as a subprocess"""
     global automation_process, automation_running
@@ -127,10 +362,11 @@ def stop_automation():
         except Exception as e:
             print(f"Error stopping tracked process: {e}")
 
-    # If no tracked process, try to find and stop by PID from stats
-    if "process_id" in automation_stats:
+    # If no tracked process, stop whichever worker holds the lock
+    worker = read_worker_lock()
+    if worker["alive"] and worker["pid"]:
         try:
-            pid = automation_stats["process_id"]
+            pid = worker["pid"]
             if psutil.pid_exists(pid):
                 process = psutil.Process(pid)
                 process.send_signal(signal.SIGINT)  # Like Ctrl+C
@@ -143,7 +379,7 @@ def stop_automation():
 
                 automation_running = False
                 automation_stats["status"] = "Stopped"
-                del automation_stats["process_id"]
+                automation_stats.pop("process_id", None)
                 save_stats()
                 return True
         except Exception as e:
@@ -151,70 +387,93 @@ def stop_automation():
 
     return False
 
-def find_automation_process():
-    """Find running X-final.py process and return its PID"""
+def read_worker_lock():
+    """Read the worker's lock file and decide liveness from lock ownership and heartbeat age"""
+    worker = {
+        "alive": False,
+        "pid": None,
+        "start_time": None,
+        "heartbeat_age": None,
+        "progress_age": None,
+        "heartbeat_interval": default_config["heartbeat_interval"]
+    }
     try:
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-            try:
-                if proc.info['cmdline'] and len(proc.info['cmdline']) >= 2:
-                    if 'python' in proc.info['name'].lower() and 'X-final.py' in ' '.join(proc.info['cmdline']):
-                        return proc.info['pid']
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+        with open(automation_lock_file, "r") as f:
+            if fcntl is not None:
+                try:
+                    # If we can take a shared lock, nobody holds the exclusive one: the file is stale
+                    fcntl.flock(f.fileno(), fcntl.LOCK_SH | fcntl.LOCK_NB)
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                    return worker
+                except OSError:
+                    worker["alive"] = True
+            heartbeat_mtime = os.fstat(f.fileno()).st_mtime
+            raw = f.read()
+    except FileNotFoundError:
+        return worker
     except Exception:
-        pass
-    return None
+        return worker
+
+    now = time.time()
+    try:
+        info = json.loads(raw)
+    except ValueError:
+        # Caught the worker mid-rewrite; the file's mtime is as good as the heartbeat field
+        info = {"heartbeat": heartbeat_mtime}
+
+    worker["pid"] = info.get("pid")
+    worker["start_time"] = info.get("start_time")
+    worker["heartbeat_interval"] = info.get("heartbeat_interval", worker["heartbeat_interval"])
+    worker["heartbeat_age"] = now - info.get("heartbeat", heartbeat_mtime)
+    if info.get("last_progress"):
+        worker["progress_age"] = now - info["last_progress"]
+    if fcntl is None:
+        worker["alive"] = bool(worker["pid"]) and psutil.pid_exists(worker["pid"])
+    return worker
+
+def describe_worker_health(worker, config):
+    """Map lock/heartbeat information onto a dashboard status"""
+    if not worker["alive"]:
+        return "Stopped"
+    # Allow a few missed beats before calling the worker unresponsive
+    if worker["heartbeat_age"] is not None and worker["heartbeat_age"] > 3 * worker["heartbeat_interval"]:
+        return "Unresponsive"
+    if worker["progress_age"] is not None and worker["progress_age"] > config["stall_threshold"]:
+        return "Stalled"
+    return "Running"
 
 def check_automation_status():
     """Check if the automation process is still running"""
     global automation_process, automation_running
 
     # First check if we have a tracked process
+    if automation_process is not None and automation_process.poll() is not None:
+        # Process has finished
+        automation_process = None
+
+    # The lock file is authoritative for every worker, tracked or not
+    worker = read_worker_lock()
+    if worker["alive"]:
+        automation_running = True
+        automation_stats["process_id"] = worker["pid"]
+        if worker["start_time"]:
+            automation_stats["start_time"] = datetime.fromtimestamp(worker["start_time"])
+        # Display only: the live worker owns automation_stats.json while it runs
+        automation_stats["status"] = describe_worker_health(worker, load_config())
+        return
+
+    # A freshly spawned worker may not have taken the lock yet
     if automation_process is not None:
-        if automation_process.poll() is not None:
-            # Process has finished
-            automation_running = False
-            automation_process = None
-            if automation_stats["status"] == "Running":
-                automation_stats["status"] = "Stopped"
-                if "process_id" in automation_stats:
-                    del automation_stats["process_id"]
-            save_stats()
-        else:
-            # Process is still running
-            automation_running = True
-            return
-
-    # If no tracked process, check if there's a saved PID that's still running
-    if "process_id" in automation_stats:
-        try:
-            pid = automation_stats["process_id"]
-            if psutil.pid_exists(pid):
-                # Process is still running, but we lost track of it
-                automation_running = True
-                automation_stats["status"] = "Running"
-                save_stats()
-                return
-            else:
-                # Process no longer exists
-                automation_running = False
-                automation_stats["status"] = "Stopped"
-                del automation_stats["process_id"]
-                save_stats()
-        except Exception:
-            pass
-
-    # If status shows "Running" but no PID tracked, try to find the process
-    if automation_stats.get("status") == "Running" and "process_id" not in automation_stats:
-        found_pid = find_automation_process()
-        if found_pid:
-            automation_stats["process_id"] = found_pid
-            automation_running = True
-            save_stats()
-            return
+        automation_running = True
+        return
 
-    # No process exists
     automation_running = False
+    if not automation_stats.get("status", "").startswith("Stopped") or "process_id" in automation_stats:
+        # Keep "Stopped by user" and similar final states written by the worker
+        if not automation_stats.get("status", "").startswith("Stopped"):
+            automation_stats["status"] = "Stopped"
+        automation_stats.pop("process_id", None)
+        save_stats()
 
 def main():
     st.set_page_config(
@@ -224,9 +483,9 @@ def main():
         initial_sidebar_state="expanded"
     )
 
-    # Check automation status and load statistics
-    check_automation_status()
+    # Load statistics, then let the worker lock decide the live status
     load_stats()
+    check_automation_status()
 
     # Header
     st.markdown("""
@@ -248,7 +507,9 @@ def main():
             status_color_map = {
                 "Running": "#00C851",
                 "Stopped": "#FF4444",
-                "Stopping...": "#FF8800"
+                "Stopping...": "#FF8800",
+                "Stalled": "#FF8800",
+                "Unresponsive": "#FF8800"
             }
 
             current_status = automation_stats.get("status", "Stopped")
@@ -493,6 +754,157 @@ def main():
             </div>
             """, unsafe_allow_html=True)
 
+        # LLM spend and governor state reported by the worker
+        generation = automation_stats.get("generation")
+        if generation:
+            governor = automation_stats.get("governor", {})
+            run_usage, today_usage = generation["run"], generation["today"]
+
+            col_usage1, col_usage2, col_usage3 = st.columns(3)
+            col_usage1.metric("Spend today", f"${today_usage['cost_usd']:.2f}")
+            col_usage2.metric("Run tokens", f"{run_usage['prompt_tokens'] + run_usage['completion_tokens']:,}")
+            col_usage3.metric("Avg latency", f"{run_usage['avg_latency_s']:.1f}s" if run_usage["avg_latency_s"] else "–")
+
+            if governor.get("paused"):
+                st.warning(f"⏸️ Generation paused: {governor.get('reason')}")
+            elif governor.get("throttled"):
+                st.caption(f"🐢 {governor['throttled']} generations delayed near a budget")
+
+        llm_health = automation_stats.get("llm_health")
+        if llm_health and automation_running:
+            breaker = llm_health["breaker"]
+            health_icon = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}.get(breaker["state"], "⚪")
+            st.caption(f"{health_icon} OpenAI upstream: circuit {breaker['state'].replace('_', '-')} · "
+                       f"{llm_health['retries']} retries · {llm_health['timeouts']} timeouts · "
+                       f"{llm_health['rate_limited']} rate-limited")
+
+        gate = automation_stats.get("gate")
+        if gate and gate.get("checked"):
+            st.caption(f"🚦 Relevance gate ({gate['mode']}): {gate['passed']}/{gate['checked']} passed "
+                       f"({gate['pass_rate']:.0%}) · {gate['rejected_heuristic']} heuristic / "
+                       f"{gate['rejected_model']} model rejections")
+
+        validation = automation_stats.get("reply_validation")
+        if validation and validation.get("candidates"):
+            rejected = ", ".join(f"{count} {reason}" for reason, count in validation["rejected"].items()) or "none"
+            st.caption(f"✂️ Reply candidates: {validation['candidates']} generated ({validation['valid_rate']:.0%} valid) · "
+                       f"rejected: {rejected} · {validation['reprompts']} re-prompts · "
+                       f"{validation['exhausted']} tweets without a valid reply")
+
+        candidates = automation_stats.get("queue")
+        if candidates and candidates.get("enqueued"):
+            wait = f"{candidates['avg_wait_s']}s avg wait" if candidates["avg_wait_s"] is not None else "no dispatches yet"
+            st.caption(f"🗂️ Candidate queue: {candidates['depth']} waiting · {candidates['dequeued']}/"
+                       f"{candidates['enqueued']} dispatched · {wait} · "
+                       f"{candidates['dropped_full']} dropped full / {candidates['dropped_expired']} expired")
+
+        duplicates = automation_stats.get("near_duplicates")
+        if duplicates and duplicates.get("near_duplicates"):
+            reasons = ", ".join(f"{count} {decision}" for decision, count in duplicates["skipped"].items())
+            st.caption(f"🧬 Near-duplicates skipped: {duplicates['near_duplicates']} of "
+                       f"{duplicates['checked']} checked ({reasons})")
+
+        scrolling = automation_stats.get("scrolling")
+        if scrolling and scrolling.get("scrolls"):
+            st.caption(f"🧭 Scrolling: {scrolling['avg_new_tweets']} new tweets and "
+                       f"{scrolling['avg_wait_s']}s wait per scroll over {scrolling['scrolls']} scrolls")
+
+        idle = automation_stats.get("idle")
+        if idle and idle.get("idle_scrolls"):
+            st.caption(f"💤 Idle backoff: {idle['idle_scrolls']} idle scrolls · {idle['refreshes']} refreshes · "
+                       f"{idle['backoff_total_s']}s backed off · current streak {idle['idle_streak']}")
+
+        handles = automation_stats.get("handles")
+        if handles and handles.get("created"):
+            st.caption(f"🧹 Element handles: {handles['live']} live · {handles['created']} created / "
+                       f"{handles['disposed']} disposed")
+
+        ingestion = automation_stats.get("ingestion")
+        if ingestion and ingestion.get("responses"):
+            parse_cost = f"{ingestion['parse_us_per_tweet']}µs/tweet" if ingestion["parse_us_per_tweet"] is not None else "n/a"
+            st.caption(f"📡 Ingestion ({ingestion['mode']}): {ingestion['tweets']} tweets from "
+                       f"{ingestion['responses']} timeline responses · {parse_cost} · "
+                       f"{ingestion['errors']} errors")
+
+        session = automation_stats.get("session")
+        if session and session.get("time_to_home_ms"):
+            st.caption(f"🍪 Session ({session['mode']}): launch {session['launch_ms']}ms · home after "
+                       f"{session['time_to_home_ms']}ms · {session['state_bytes'] / 1e6:.1f} MB of state")
+
+        dry_run = automation_stats.get("dry_run")
+        if dry_run:
+            st.caption(f"🧪 Dry run: {dry_run['written']} rows written to {dry_run['output']} · "
+                       f"{dry_run['generated']} generated / {dry_run['rejected']} gated / {dry_run['failed']} failed · "
+                       f"{dry_run['in_flight']} in flight")
+
+        timeouts = automation_stats.get("timeouts")
+        if timeouts:
+            st.caption("⏱️ Timeouts: " + " · ".join(
+                f"{op} {value['timeout_s']}s ({value['samples']} samples, {value['timeouts']} timed out)"
+                for op, value in timeouts.items()))
+
+        submission = automation_stats.get("submission")
+        if submission and any(submission.values()):
+            confirmed = submission["confirmed"]
+            latency = f"{submission['confirm_ms_total'] / confirmed:.0f}ms avg confirmation" if confirmed else "none confirmed yet"
+            st.caption(f"📨 Submissions: {confirmed} confirmed ({latency}) · {submission['rejected']} rejected · "
+                       f"{submission['no_request']} never sent · {submission['no_response']} unanswered")
+
+        auth = automation_stats.get("auth")
+        if auth and auth.get("checked_at"):
+            checked = datetime.fromtimestamp(auth["checked_at"]).strftime("%H:%M:%S")
+            expiry = f", expires in {auth['expires_in_h']}h" if auth.get("expires_in_h") is not None else ""
+            if auth["logged_in"]:
+                st.caption(f"🍪 X session: {auth['reason']}{expiry} (checked {checked})")
+            else:
+                st.warning(f"🔒 X session: {auth['reason']} (checked {checked})")
+
+        actor = automation_stats.get("actor")
+        if actor and actor.get("attempted"):
+            busy = f", replying to {actor['busy_with']}" if actor.get("busy_with") else ""
+            st.caption(f"🎭 Reply page: {actor['posted']}/{actor['attempted']} candidates posted, "
+                       f"{actor['avg_reply_s']}s per reply · {actor['errors']} errors{busy}")
+
+        watchdog = automation_stats.get("watchdog")
+        if watchdog and watchdog.get("last_escalation"):
+            last = watchdog["last_escalation"]
+            counts = ", ".join(f"{target} {step} {count}" for target, steps in watchdog["escalations"].items()
+                               for step, count in steps.items() if count)
+            at = datetime.fromtimestamp(last["at"]).strftime("%H:%M:%S")
+            st.caption(f"🐕 Stall watchdog: {counts}; last {last['target']} {last['step']} at {at} after {last['stalled_s']}s "
+                       f"without progress{'' if last['ok'] else ' (failed)'}, {watchdog['recoveries']} recoveries")
+
+        # Historical throughput and latency from the analytics store
+        st.markdown("### 📈 History")
+
+        history_range = st.selectbox("Range", list(HISTORY_RANGES), index=1, key="history_range")
+        level, seconds = HISTORY_RANGES[history_range]
+        history = load_history(load_config()["analytics_db"], level, seconds)
+
+        if history:
+            times = [datetime.fromtimestamp(row["bucket"]) for row in history]
+            scanned = sum(row["scanned"] for row in history)
+            matched = sum(row["matched"] for row in history)
+            posted = sum(row["posted"] for row in history)
+
+            col_hist1, col_hist2, col_hist3 = st.columns(3)
+            col_hist1.metric("Scanned", int(scanned))
+            col_hist2.metric("Match rate", f"{matched / scanned:.1%}" if scanned else "–")
+            col_hist3.metric("Posted", int(posted))
+
+            st.bar_chart(
+                {"time": times, **{name: [row[name] for row in history]
+                                   for name in ("scanned", "matched", "generated", "posted")}},
+                x="time"
+            )
+            st.line_chart(
+                {"time": times, **{f"{stage} {q} (ms)": [row[f"{stage}_{q}"] for row in history]
+                                   for stage in ("generation", "reply") for q in ("p50", "p95")}},
+                x="time"
+            )
+        else:
+            st.caption("No history recorded yet.")
+
         # Current Configuration Summary
         st.markdown("### 🔧 Current Settings")
 
@@ -514,6 +926,28 @@ def main():
         with st.expander("📋 Full Configuration"):
             st.json(current_config)
 
+    # Live activity from the worker's event log
+    st.markdown("---")
+    st.markdown("### 📡 Live Activity")
+
+    log_tail = get_log_tail(load_config()["log_file"])
+    event_types = ["tweet_seen", "tweet_matched", "generation_done", "reply_submitted", "error", "message"]
+
+    col_filter1, col_filter2, col_filter3 = st.columns([3, 2, 1])
+    with col_filter1:
+        selected_types = st.multiselect("Event types", event_types, key="activity_types",
+                                        help="Leave empty to show every event")
+    with col_filter2:
+        tweet_filter = st.text_input("Tweet ID", key="activity_tweet_id").strip()
+    with col_filter3:
+        row_limit = st.number_input("Rows", min_value=10, max_value=500, value=50, step=10, key="activity_rows")
+
+    recent_events = log_tail.query(selected_types, tweet_filter, int(row_limit))
+    if recent_events:
+        st.dataframe([format_event_row(e) for e in recent_events], use_container_width=True, hide_index=True)
+    else:
+        st.caption("No matching activity yet.")
+
     # Footer
     st.markdown("---")
     st.markdown("""